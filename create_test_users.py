@@ -8,10 +8,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.user import User, db
 from src.models.sala import Sala
-from src.main import app
+from src.main import create_app, inicializar_banco
+
+app = create_app()
 
 def create_test_users():
     with app.app_context():
+        # Garantir que as tabelas e as salas padrão existam
+        inicializar_banco()
+        
         # Verificar se já existem usuários
         if User.query.count() > 0:
             print("Usuários já existem no sistema.")
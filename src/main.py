@@ -3,36 +3,44 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
 from src.models.sala import Sala
 from src.models.reuniao import Reuniao
+from src.models.recorrencia import RegraRecorrencia
+from src.models.email_saida import EmailSaida
+from src.models.historico import ReuniaoHistorico
+from src.models.versao import versao_tabela
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.sala import sala_bp
 from src.routes.reuniao import reuniao_bp
+from src.routes.monitor import monitor_bp
+from src.utils.arquivamento import ARQUIVO_HORIZONTE_DIAS, TAMANHO_LOTE_ARQUIVO, arquivar_reunioes
+from src.utils.banco import configurar_banco, descrever_banco
+from src.utils.cache_calendario import configurar_cache_calendario
+from src.utils.compressao import configurar_compressao
+from src.utils.email_service import configurar_despacho_emails
+from src.utils.estaticos import ManifestoEstaticos
+from src.utils.ultimo_login import configurar_buffer_ultimo_login
+from src.utils.migracoes import aplicar_migracoes
+import click
+import logging
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'), format='%(asctime)s %(levelname)s %(message)s')
 
-# Habilitar CORS para todas as rotas
-CORS(app)
 
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(sala_bp, url_prefix='/api')
-app.register_blueprint(reuniao_bp, url_prefix='/api')
-
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-with app.app_context():
+def inicializar_banco():
+    """
+    Cria o esquema, aplica as migrações e cria as salas padrão. Roda uma vez
+    por deploy (flask --app src.main init-db), não a cada worker.
+    """
     db.create_all()
     
+    # Aplicar alterações de esquema em bancos já existentes
+    aplicar_migracoes()
+    
     # Criar salas padrão se não existirem
     if Sala.query.count() == 0:
         salas_padrao = [
@@ -45,22 +53,81 @@ with app.app_context():
         db.session.commit()
         print("Salas padrão criadas!")
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+def create_app(config=None):
+    """
+    Cria a aplicação sem tocar no esquema do banco nem escrever nele, para
+    que workers subam rápido e o app possa ser pré-carregado (--preload).
+    `config` sobrescreve as configurações padrão (ex.: SQLALCHEMY_DATABASE_URI).
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    
+    # Habilitar CORS para todas as rotas
+    CORS(app)
+    
+    # Registrar blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(sala_bp, url_prefix='/api')
+    app.register_blueprint(reuniao_bp, url_prefix='/api')
+    app.register_blueprint(monitor_bp, url_prefix='/api')
+    
+    # Configuração do banco de dados (DATABASE_URL ou SQLite local em WAL)
+    configurar_banco(app)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    db.init_app(app)
+    
+    # Cache do calendário mensal, compartilhado pelos workers em um arquivo SQLite
+    configurar_cache_calendario(app)
+    
+    # Envio dos emails da caixa de saída em segundo plano
+    configurar_despacho_emails(app)
+    
+    # Gravação em lote do último login
+    configurar_buffer_ultimo_login(app)
+    
+    # Compressão gzip/deflate negociada das respostas da API
+    configurar_compressao(app)
+    
+    with app.app_context():
+        descrever_banco(db.engine)
+        # Não levar conexões abertas para os workers criados por fork (--preload)
+        db.engine.dispose()
+    
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria as tabelas, aplica as migrações e cria as salas padrão."""
+        inicializar_banco()
+        print("Banco de dados inicializado.")
+    
+    @app.cli.command('arquivar-reunioes')
+    @click.option('--dias', default=ARQUIVO_HORIZONTE_DIAS, show_default=True,
+                  help='Arquiva reuniões que terminaram há mais dias que isso.')
+    @click.option('--lote', default=TAMANHO_LOTE_ARQUIVO, show_default=True,
+                  help='Reuniões movidas por transação.')
+    def arquivar(dias, lote):
+        """Move reuniões antigas e canceladas para o histórico."""
+        total = arquivar_reunioes(dias, lote)
+        print(f"{total} reuniões arquivadas.")
+    
+    # Estáticos com hash no nome e pré-comprimidos, servidos da memória
+    estaticos = ManifestoEstaticos(app.static_folder)
+    
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if app.static_folder is None:
+            return "Static folder not configured", 404
+        return estaticos.servir(path)
+    
+    return app
 
 
 if __name__ == '__main__':
+    # Em desenvolvimento, inicializa o banco na própria execução
+    app = create_app()
+    with app.app_context():
+        inicializar_banco()
     app.run(host='0.0.0.0', port=5000, debug=True)
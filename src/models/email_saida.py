@@ -0,0 +1,52 @@
+from datetime import datetime
+from src.models.user import db
+
+# Estados de um email na caixa de saída; 'falha' é a fila de mensagens mortas
+ESTADOS_EMAIL = ('pendente', 'enviando', 'enviado', 'falha')
+
+class EmailSaida(db.Model):
+    """
+    Caixa de saída de notificações. A linha é gravada na mesma transação da
+    alteração da reunião e enviada depois pelo despacho em segundo plano,
+    então um commit confirmado garante que a notificação será enviada.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    destinatarios = db.Column(db.JSON, nullable=False)  # Apenas os que ainda faltam enviar
+    assunto = db.Column(db.String(300), nullable=False)
+    corpo_html = db.Column(db.Text, nullable=False)
+    corpo_texto = db.Column(db.Text)
+    estado = db.Column(db.String(10), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lote = db.Column(db.String(32))  # Token de quem reivindicou a linha para envio
+    ultimo_erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Busca das linhas prontas para envio
+        db.Index('ix_email_saida_estado_proxima', 'estado', 'proxima_tentativa'),
+    )
+
+    def __repr__(self):
+        return f'<EmailSaida {self.assunto} {self.estado}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'destinatarios': self.destinatarios,
+            'assunto': self.assunto,
+            'estado': self.estado,
+            'tentativas': self.tentativas,
+            'proxima_tentativa': self.proxima_tentativa.isoformat() if self.proxima_tentativa else None,
+            'ultimo_erro': self.ultimo_erro,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'enviado_em': self.enviado_em.isoformat() if self.enviado_em else None
+        }
+
+    @staticmethod
+    def contagem_por_estado():
+        linhas = db.session.query(EmailSaida.estado, db.func.count(EmailSaida.id)).group_by(EmailSaida.estado).all()
+        contagem = dict.fromkeys(ESTADOS_EMAIL, 0)
+        contagem.update(dict(linhas))
+        return contagem
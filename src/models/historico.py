@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
+from src.models.reuniao import Reuniao, consultar_eventos_calendario
+from src.models.user import db
+
+# Participantes das reuniões arquivadas
+participantes_reuniao_historico = db.Table('participantes_reuniao_historico',
+    db.Column('reuniao_id', db.Integer, db.ForeignKey('reuniao_historico.id'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True)
+)
+
+class ReuniaoHistorico(db.Model):
+    """
+    Reuniões passadas e canceladas movidas para fora de `reuniao` pelo
+    arquivamento (flask --app src.main arquivar-reunioes). Mantém o mesmo id
+    e as mesmas colunas, então as leituras podem juntar as duas tabelas.
+    """
+    __tablename__ = 'reuniao_historico'
+    __table_args__ = (
+        # Leituras por período e o limite do que já foi arquivado
+        db.Index('ix_reuniao_historico_ativa_periodo', 'ativa', 'data_fim', 'data_inicio'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    titulo = db.Column(db.String(200), nullable=False)
+    descricao = db.Column(db.Text)
+    data_inicio = db.Column(db.DateTime, nullable=False)
+    data_fim = db.Column(db.DateTime, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False)
+    ativa = db.Column(db.Boolean, nullable=False)
+    atualizado_em = db.Column(db.DateTime)
+    versao = db.Column(db.Integer, nullable=False, default=0, index=True)
+    sala_id = db.Column(db.Integer, db.ForeignKey('sala.id'), nullable=False)
+    criador_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    serie_id = db.Column(db.Integer)  # Série de recorrência de origem, se houver
+    arquivado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    sala_reuniao = db.relationship('Sala')
+    criador = db.relationship('User', foreign_keys=[criador_id])
+    participantes = db.relationship('User', secondary=participantes_reuniao_historico)
+
+    def __repr__(self):
+        return f'<ReuniaoHistorico {self.titulo}>'
+
+    # Mesma serialização das reuniões ativas
+    to_dict = Reuniao.to_dict
+
+    @staticmethod
+    def query_serializacao():
+        return ReuniaoHistorico.query.options(
+            joinedload(ReuniaoHistorico.sala_reuniao),
+            joinedload(ReuniaoHistorico.criador),
+            selectinload(ReuniaoHistorico.participantes)
+        )
+
+    @staticmethod
+    def limite_arquivado():
+        """Fim da reunião ativa arquivada mais recente, ou None se não há nenhuma"""
+        return db.session.query(db.func.max(ReuniaoHistorico.data_fim)).filter(
+            ReuniaoHistorico.ativa == True
+        ).scalar()
+
+    @staticmethod
+    def cobre_periodo(inicio):
+        """
+        Se um período que começa em `inicio` (None = sem limite) pode conter
+        reuniões ativas arquivadas. Só estas aparecem nas leituras, e o
+        arquivamento só move reuniões ativas que já terminaram.
+        """
+        limite = ReuniaoHistorico.limite_arquivado()
+        return limite is not None and (inicio is None or inicio <= limite)
+
+    @staticmethod
+    def eventos_calendario(inicio, fim):
+        return consultar_eventos_calendario(ReuniaoHistorico, participantes_reuniao_historico, inicio, fim)
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+import calendar
+from src.models.user import db
+
+# Limite de ocorrências geradas por uma única série
+MAX_OCORRENCIAS = 366
+
+FREQUENCIAS = ('diaria', 'semanal', 'mensal')
+
+# Tabela de associação entre a série e as reuniões geradas
+reunioes_serie = db.Table('reunioes_serie',
+    db.Column('serie_id', db.Integer, db.ForeignKey('regra_recorrencia.id'), primary_key=True),
+    db.Column('reuniao_id', db.Integer, db.ForeignKey('reuniao.id'), primary_key=True, unique=True)
+)
+
+class RegraRecorrencia(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    frequencia = db.Column(db.String(10), nullable=False)
+    intervalo = db.Column(db.Integer, nullable=False, default=1)
+    dias_semana = db.Column(db.JSON)  # 0 = segunda ... 6 = domingo
+    contagem = db.Column(db.Integer)
+    ate = db.Column(db.Date)
+    excecoes = db.Column(db.JSON)  # Datas ISO (YYYY-MM-DD) a pular
+    data_inicio = db.Column(db.DateTime, nullable=False)  # Primeira ocorrência
+    data_fim = db.Column(db.DateTime, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    criador_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    reunioes = db.relationship('Reuniao', secondary=reunioes_serie,
+                               backref=db.backref('serie', uselist=False))
+
+    def __repr__(self):
+        return f'<RegraRecorrencia {self.frequencia} {self.data_inicio}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'frequencia': self.frequencia,
+            'intervalo': self.intervalo,
+            'dias_semana': self.dias_semana,
+            'contagem': self.contagem,
+            'ate': self.ate.isoformat() if self.ate else None,
+            'excecoes': self.excecoes or [],
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None,
+            'criador_id': self.criador_id
+        }
+
+    def validar(self):
+        """Retorna uma mensagem de erro se a regra for inválida"""
+        if self.frequencia not in FREQUENCIAS:
+            return f"Frequência deve ser uma de: {', '.join(FREQUENCIAS)}"
+        if not self.intervalo or self.intervalo < 1:
+            return 'Intervalo deve ser um inteiro positivo'
+        if not self.contagem and not self.ate:
+            return 'Informe a quantidade de ocorrências ou a data final da série'
+        if self.contagem and not 0 < self.contagem <= MAX_OCORRENCIAS:
+            return f'Quantidade de ocorrências deve estar entre 1 e {MAX_OCORRENCIAS}'
+        if self.ate and self.ate < self.data_inicio.date():
+            return 'Data final da série anterior à primeira ocorrência'
+        if self.dias_semana and (self.frequencia != 'semanal'
+                                 or any(d not in range(7) for d in self.dias_semana)):
+            return 'Dias da semana só valem para séries semanais (0 = segunda ... 6 = domingo)'
+        return None
+
+    def _datas(self):
+        """Gera as datas da série, sem aplicar exceções nem limites"""
+        inicio = self.data_inicio.date()
+        if self.frequencia == 'diaria':
+            atual = inicio
+            while True:
+                yield atual
+                atual += timedelta(days=self.intervalo)
+        elif self.frequencia == 'semanal':
+            dias = sorted(set(self.dias_semana or [inicio.weekday()]))
+            semana = inicio - timedelta(days=inicio.weekday())
+            while True:
+                for dia in dias:
+                    atual = semana + timedelta(days=dia)
+                    if atual >= inicio:
+                        yield atual
+                semana += timedelta(weeks=self.intervalo)
+        else:
+            ano, mes = inicio.year, inicio.month
+            while True:
+                # Meses sem o dia (ex.: 31) usam o último dia do mês
+                ultimo_dia = calendar.monthrange(ano, mes)[1]
+                yield date(ano, mes, min(inicio.day, ultimo_dia))
+                mes += self.intervalo
+                ano, mes = ano + (mes - 1) // 12, (mes - 1) % 12 + 1
+
+    def expandir(self):
+        """Lista de (data_inicio, data_fim) de cada ocorrência da série"""
+        duracao = self.data_fim - self.data_inicio
+        hora = self.data_inicio.time()
+        excecoes = {date.fromisoformat(d) for d in (self.excecoes or [])}
+        ocorrencias = []
+        for gerada, dia in enumerate(self._datas()):
+            if self.contagem and gerada >= self.contagem:
+                break
+            if self.ate and dia > self.ate:
+                break
+            if gerada >= MAX_OCORRENCIAS:
+                break
+            if dia in excecoes:
+                continue
+            inicio = datetime.combine(dia, hora)
+            ocorrencias.append((inicio, inicio + duracao))
+        return ocorrencias
@@ -1,13 +1,32 @@
+from collections import namedtuple
 from datetime import datetime, timedelta
-from src.models.user import db
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+from src.models.sala import Sala
+from src.models.user import User, db
+from src.models.versao import obter_versoes
+from src.utils.intervalos import IndiceSalas
+import logging
+
+# Intervalo mínimo entre duas reuniões na mesma sala
+BUFFER_REUNIAO = timedelta(minutes=10)
 
 # Tabela de associação para participantes da reunião
 participantes_reuniao = db.Table('participantes_reuniao',
     db.Column('reuniao_id', db.Integer, db.ForeignKey('reuniao.id'), primary_key=True),
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    # A chave primária começa por reuniao_id; buscas por participante usam este
+    db.Index('ix_participantes_reuniao_user', 'user_id', 'reuniao_id')
 )
 
 class Reuniao(db.Model):
+    __table_args__ = (
+        # Conflitos de sala e listagens filtradas por sala
+        db.Index('ix_reuniao_sala_ativa_periodo', 'sala_id', 'ativa', 'data_inicio', 'data_fim'),
+        # Ids nunca são reaproveitados: o histórico mantém o id das reuniões arquivadas
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
     descricao = db.Column(db.Text)
@@ -16,6 +35,10 @@ class Reuniao(db.Model):
     criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     ativa = db.Column(db.Boolean, nullable=False, default=True)
     
+    # Controle de alterações para sincronização incremental
+    atualizado_em = db.Column(db.DateTime)
+    versao = db.Column(db.Integer, nullable=False, default=0, index=True)
+    
     # Chaves estrangeiras
     sala_id = db.Column(db.Integer, db.ForeignKey('sala.id'), nullable=False)
     criador_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -44,58 +67,317 @@ class Reuniao(db.Model):
             'participantes': [{'id': p.id, 'username': p.username, 'email': p.email} for p in self.participantes]
         }
 
+    @staticmethod
+    def opcoes_serializacao():
+        """
+        Carregamentos usados por to_dict: sala e criador no mesmo JOIN e
+        participantes em uma consulta IN, evitando uma consulta por reunião.
+        """
+        return (
+            joinedload(Reuniao.sala_reuniao),
+            joinedload(Reuniao.criador),
+            selectinload(Reuniao.participantes)
+        )
+
+    @staticmethod
+    def query_serializacao():
+        """Query de reuniões pronta para serialização com to_dict"""
+        return Reuniao.query.options(*Reuniao.opcoes_serializacao())
+
+    @staticmethod
+    def eventos_calendario(inicio, fim):
+        """Eventos do calendário entre `inicio` e `fim` (ver consultar_eventos_calendario)"""
+        return consultar_eventos_calendario(Reuniao, participantes_reuniao, inicio, fim)
+
     @staticmethod
     def verificar_conflito_horario(sala_id, data_inicio, data_fim, reuniao_id=None):
         """
         Verifica se há conflito de horário para uma sala específica.
         Considera um buffer de 10 minutos antes e depois de cada reunião.
+        Consulta o índice em memória da sala (sincronizado pelo contador de
+        versão das reuniões) e, em caso de falha, o banco.
         """
-        buffer = timedelta(minutes=10)
-        inicio_com_buffer = data_inicio - buffer
-        fim_com_buffer = data_fim + buffer
-        
+        inicio_com_buffer = data_inicio - BUFFER_REUNIAO
+        fim_com_buffer = data_fim + BUFFER_REUNIAO
+
+        try:
+            ids = indice_salas.conflitos(int(sala_id), inicio_com_buffer, fim_com_buffer,
+                                         ignorar_id=int(reuniao_id) if reuniao_id else None)
+        except Exception as e:
+            logging.warning(f"Índice de salas indisponível, consultando o banco: {str(e)}")
+            return Reuniao._conflitos_horario_sql(sala_id, inicio_com_buffer, fim_com_buffer, reuniao_id)
+
+        if not ids:
+            return []
+
+        # Confirmar no banco apenas os candidatos encontrados no índice, com a
+        # mesma condição da consulta completa (a reunião pode ter mudado)
+        return Reuniao.query.filter(
+            Reuniao.id.in_(ids),
+            Reuniao.sala_id == sala_id,
+            Reuniao.ativa == True,
+            Reuniao.data_inicio < fim_com_buffer,
+            Reuniao.data_fim > inicio_com_buffer
+        ).order_by(Reuniao.data_inicio).all()
+
+    @staticmethod
+    def _conflitos_horario_sql(sala_id, inicio_com_buffer, fim_com_buffer, reuniao_id=None):
+        """Versão da verificação de conflito feita diretamente no banco"""
         query = Reuniao.query.filter(
             Reuniao.sala_id == sala_id,
             Reuniao.ativa == True,
-            db.or_(
-                # Nova reunião começa durante uma existente (com buffer)
-                db.and_(inicio_com_buffer < Reuniao.data_fim, data_inicio < Reuniao.data_fim),
-                # Nova reunião termina durante uma existente (com buffer)
-                db.and__(data_fim > Reuniao.data_inicio, fim_com_buffer > Reuniao.data_inicio),
-                # Nova reunião engloba uma existente
-                db.and__(data_inicio <= Reuniao.data_inicio, data_fim >= Reuniao.data_fim)
-            )
+            Reuniao.data_inicio < fim_com_buffer,
+            Reuniao.data_fim > inicio_com_buffer
         )
-        
+
         # Se estamos editando uma reunião, excluir ela da verificação
         if reuniao_id:
             query = query.filter(Reuniao.id != reuniao_id)
-            
-        conflitos = query.all()
-        return conflitos
+
+        return query.order_by(Reuniao.data_inicio).all()
 
     @staticmethod
     def verificar_disponibilidade_participante(user_id, data_inicio, data_fim, reuniao_id=None):
         """
         Verifica se um participante está disponível no horário solicitado.
         """
-        query = db.session.query(Reuniao).join(participantes_reuniao).filter(
+        query = db.session.query(Reuniao.id).join(participantes_reuniao).filter(
             participantes_reuniao.c.user_id == user_id,
             Reuniao.ativa == True,
-            db.or_(
-                # Nova reunião começa durante uma existente
-                db.and__(data_inicio < Reuniao.data_fim, data_inicio >= Reuniao.data_inicio),
-                # Nova reunião termina durante uma existente
-                db.and__(data_fim > Reuniao.data_inicio, data_fim <= Reuniao.data_fim),
-                # Nova reunião engloba uma existente
-                db.and__(data_inicio <= Reuniao.data_inicio, data_fim >= Reuniao.data_fim)
-            )
+            Reuniao.data_inicio < data_fim,
+            Reuniao.data_fim > data_inicio
         )
         
         # Se estamos editando uma reunião, excluir ela da verificação
         if reuniao_id:
             query = query.filter(Reuniao.id != reuniao_id)
             
-        conflitos = query.all()
-        return len(conflitos) == 0
+        return query.first() is None
+
+    @staticmethod
+    def carregar_participantes(user_ids):
+        """
+        Carrega em uma consulta os usuários informados.
+        Retorna ({id: User} dos ativos, na ordem recebida, [ids inválidos]).
+        """
+        ids = []
+        invalidos = []
+        for user_id in user_ids:
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                invalidos.append(user_id)
+                continue
+            if user_id not in ids:
+                ids.append(user_id)
+
+        usuarios = {}
+        if ids:
+            encontrados = {u.id: u for u in User.query.filter(User.id.in_(ids)).all()}
+            for user_id in ids:
+                user = encontrados.get(user_id)
+                if user and user.ativo:
+                    usuarios[user_id] = user
+                else:
+                    invalidos.append(user_id)
+        return usuarios, invalidos
+
+    @staticmethod
+    def verificar_disponibilidade_participantes(user_ids, data_inicio, data_fim, reuniao_id=None):
+        """
+        Verifica de uma só vez a disponibilidade de vários participantes.
+        Retorna um dicionário com:
+        - usuarios: {id: User} dos participantes ativos, na ordem recebida
+        - invalidos: ids inexistentes ou de usuários inativos
+        - ocupados: {id: [Reuniao]} com as reuniões que conflitam
+        """
+        usuarios, invalidos = Reuniao.carregar_participantes(user_ids)
+        resultado = {'usuarios': usuarios, 'invalidos': invalidos, 'ocupados': {}}
+        if not usuarios:
+            return resultado
+
+        query = db.session.query(participantes_reuniao.c.user_id, Reuniao).join(
+            participantes_reuniao, participantes_reuniao.c.reuniao_id == Reuniao.id
+        ).filter(
+            participantes_reuniao.c.user_id.in_(list(resultado['usuarios'])),
+            Reuniao.ativa == True,
+            Reuniao.data_inicio < data_fim,
+            Reuniao.data_fim > data_inicio
+        )
+
+        # Se estamos editando uma reunião, excluir ela da verificação
+        if reuniao_id:
+            query = query.filter(Reuniao.id != reuniao_id)
+
+        for user_id, reuniao in query.order_by(Reuniao.data_inicio).all():
+            resultado['ocupados'].setdefault(user_id, []).append(reuniao)
+
+        return resultado
+
+    @staticmethod
+    def ocupacoes(sala_id, user_ids, inicio, fim):
+        """
+        Busca em uma única consulta as reuniões ativas da sala ou dos
+        participantes que tocam o período [inicio, fim] com o buffer.
+        Retorna linhas (id, titulo, data_inicio, data_fim, sala_id, user_id);
+        user_id é None quando a reunião não tem participantes.
+        """
+        filtro = Reuniao.sala_id == sala_id
+        if user_ids:
+            filtro = db.or_(filtro, participantes_reuniao.c.user_id.in_(user_ids))
+
+        return db.session.query(
+            Reuniao.id, Reuniao.titulo, Reuniao.data_inicio, Reuniao.data_fim,
+            Reuniao.sala_id, participantes_reuniao.c.user_id
+        ).outerjoin(
+            participantes_reuniao, participantes_reuniao.c.reuniao_id == Reuniao.id
+        ).filter(
+            Reuniao.ativa == True,
+            Reuniao.data_inicio < fim + BUFFER_REUNIAO,
+            Reuniao.data_fim > inicio - BUFFER_REUNIAO,
+            filtro
+        ).all()
+
+    @staticmethod
+    def intervalos_ocupados(sala_id, user_ids, inicio, fim):
+        """
+        Intervalos ocupados da sala e dos participantes entre `inicio` e
+        `fim`. Reuniões da sala já vêm expandidas pelo buffer de 10 minutos.
+        """
+        ocupados = set()
+        for _, _, data_inicio, data_fim, reuniao_sala_id, _ in Reuniao.ocupacoes(sala_id, user_ids, inicio, fim):
+            if reuniao_sala_id == sala_id:
+                ocupados.add((data_inicio - BUFFER_REUNIAO, data_fim + BUFFER_REUNIAO))
+            else:
+                ocupados.add((data_inicio, data_fim))
+        return list(ocupados)
+
+# Calendário e listagens por período consultam apenas reuniões ativas
+db.Index('ix_reuniao_ativas_periodo', Reuniao.data_inicio, Reuniao.data_fim,
+         sqlite_where=Reuniao.ativa == True, postgresql_where=Reuniao.ativa == True)
+
+
+def consultar_eventos_calendario(modelo, participantes, inicio, fim):
+    """
+    Eventos do calendário entre `inicio` e `fim` em uma única consulta
+    projetada: apenas as colunas necessárias, nome da sala e do criador
+    via JOIN e a contagem de participantes em subconsulta correlacionada.
+    Serve para `reuniao` e para o histórico, que têm as mesmas colunas.
+    """
+    participantes_count = db.select(db.func.count()).select_from(participantes).where(
+        participantes.c.reuniao_id == modelo.id
+    ).correlate(modelo).scalar_subquery()
+
+    linhas = db.session.execute(
+        db.select(
+            modelo.id, modelo.titulo, modelo.data_inicio, modelo.data_fim,
+            Sala.nome, User.username, participantes_count
+        ).join(Sala, Sala.id == modelo.sala_id).join(
+            User, User.id == modelo.criador_id
+        ).where(
+            modelo.ativa == True,
+            modelo.data_inicio <= fim,
+            modelo.data_fim >= inicio
+        ).order_by(modelo.data_inicio)
+    )
+
+    return [{
+        'id': reuniao_id,
+        'title': titulo,
+        'start': data_inicio.isoformat(),
+        'end': data_fim.isoformat(),
+        'sala': sala_nome,
+        'participantes_count': total,
+        'criador': criador
+    } for reuniao_id, titulo, data_inicio, data_fim, sala_nome, criador, total in linhas]
+
+
+def _carregar_reunioes_sala(sala_id):
+    """Intervalos das reuniões ativas de uma sala, para o índice em memória"""
+    return db.session.query(Reuniao.id, Reuniao.data_inicio, Reuniao.data_fim).filter(
+        Reuniao.sala_id == sala_id,
+        Reuniao.ativa == True
+    ).all()
+
+
+def _versao_reunioes():
+    return obter_versoes(['reuniao'])['reuniao']
+
+
+def _reunioes_alteradas_desde(versao):
+    """Reuniões confirmadas depois de `versao`, inclusive por outros processos"""
+    return db.session.query(
+        Reuniao.id, Reuniao.sala_id, Reuniao.data_inicio, Reuniao.data_fim, Reuniao.ativa
+    ).filter(Reuniao.versao > versao).all()
+
+
+indice_salas = IndiceSalas(_carregar_reunioes_sala, versao_atual=_versao_reunioes,
+                           alteracoes_desde=_reunioes_alteradas_desde)
+
+
+# Estado confirmado de uma reunião após o commit; `anteriores` guarda os
+# intervalos (data_inicio, data_fim) que ela ocupava antes da transação e
+# `nova` indica que ela foi criada nesta transação
+AlteracaoReuniao = namedtuple('AlteracaoReuniao', 'id sala_id data_inicio data_fim ativa anteriores versao nova')
+
+# Funções chamadas com a lista de alterações após cada commit
+_ouvintes_alteracoes = []
+
+
+def ao_confirmar_reunioes(funcao):
+    """Registra uma função chamada com as reuniões alteradas após cada commit"""
+    _ouvintes_alteracoes.append(funcao)
+    return funcao
+
+
+def _intervalo_anterior(obj):
+    """Intervalo da reunião antes das alterações ainda não gravadas"""
+    estado = db.inspect(obj)
+    inicio = estado.attrs.data_inicio.history.deleted
+    fim = estado.attrs.data_fim.history.deleted
+    return (inicio[0] if inicio else obj.data_inicio, fim[0] if fim else obj.data_fim)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_reunioes_alteradas(session, flush_context):
+    """Guarda o estado das reuniões gravadas até o commit da transação"""
+    alteradas = session.info.setdefault('reunioes_alteradas', {})
+    for obj in session.new | session.dirty | session.deleted:
+        if not isinstance(obj, Reuniao):
+            continue
+        anterior = alteradas.get(obj.id)
+        anteriores = set(anterior.anteriores) if anterior else set()
+        if obj not in session.new:
+            anteriores.add(_intervalo_anterior(obj))
+        alteradas[obj.id] = AlteracaoReuniao(
+            obj.id, obj.sala_id, obj.data_inicio, obj.data_fim,
+            obj.ativa and obj not in session.deleted, frozenset(anteriores),
+            obj.versao, obj in session.new or bool(anterior and anterior.nova)
+        )
+
+
+@event.listens_for(Session, 'after_commit')
+def _notificar_reunioes_alteradas(session):
+    """Repassa aos ouvintes as reuniões confirmadas no commit"""
+    alteradas = session.info.pop('reunioes_alteradas', None)
+    if not alteradas:
+        return
+    alteracoes = list(alteradas.values())
+    for ouvinte in _ouvintes_alteracoes:
+        try:
+            ouvinte(alteracoes)
+        except Exception as e:
+            logging.error(f"Erro ao processar reuniões alteradas em {ouvinte.__name__}: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_reunioes_alteradas(session):
+    session.info.pop('reunioes_alteradas', None)
+
 
+@ao_confirmar_reunioes
+def _atualizar_indice_salas(alteracoes):
+    """Aplica ao índice de salas as reuniões confirmadas no commit"""
+    for alteracao in alteracoes:
+        indice_salas.registrar(alteracao.id, int(alteracao.sala_id), alteracao.data_inicio,
+                               alteracao.data_fim, alteracao.ativa)
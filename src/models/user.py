@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from src.utils.senhas import executor_senhas
 
 db = SQLAlchemy()
 
@@ -18,11 +18,19 @@ class User(db.Model):
 
     def set_password(self, password):
         """Define a senha do usuário com hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = executor_senhas.gerar_hash(password)
 
     def check_password(self, password):
-        """Verifica se a senha está correta"""
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifica se a senha está correta. Se o hash armazenado usa parâmetros
+        desatualizados, gera um novo hash com os atuais (o commit fica a cargo
+        de quem chamou).
+        """
+        if not executor_senhas.verificar(self.password_hash, password):
+            return False
+        if executor_senhas.precisa_rehash(self.password_hash):
+            self.password_hash = executor_senhas.gerar_hash(password)
+        return True
 
     def to_dict(self):
         return {
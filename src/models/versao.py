@@ -0,0 +1,68 @@
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.user import db
+
+# Contador de alterações por tabela, usado como versão barata dos dados
+versao_tabela = db.Table('versao_tabela',
+    db.Column('tabela', db.String(50), primary_key=True),
+    db.Column('versao', db.Integer, nullable=False, default=0)
+)
+
+# Tabelas cuja versão é acompanhada
+TABELAS_VERSIONADAS = ('reuniao', 'sala', 'user')
+
+# Contador próprio do último login, gravado em lote: só GET /api/users exibe
+# esse campo, então ele não deve invalidar as respostas que dependem de 'user'
+VERSAO_ULTIMO_LOGIN = 'user.ultimo_login'
+
+
+def incrementar_versoes(conn, tabelas):
+    """
+    Incrementa a versão das tabelas na transação da conexão informada e
+    retorna {tabela: nova versão}. A linha do contador fica bloqueada até o
+    commit, então versões confirmadas nunca ficam fora de ordem.
+    """
+    novas = {}
+    for tabela in sorted(set(tabelas)):
+        resultado = conn.execute(
+            versao_tabela.update()
+            .where(versao_tabela.c.tabela == tabela)
+            .values(versao=versao_tabela.c.versao + 1)
+        )
+        if resultado.rowcount == 0:
+            conn.execute(versao_tabela.insert().values(tabela=tabela, versao=1))
+        novas[tabela] = conn.execute(
+            db.select(versao_tabela.c.versao).where(versao_tabela.c.tabela == tabela)
+        ).scalar_one()
+    return novas
+
+
+def obter_versoes(tabelas):
+    """Versão atual de cada tabela, em uma única consulta por chave primária"""
+    linhas = db.session.execute(
+        db.select(versao_tabela.c.tabela, versao_tabela.c.versao)
+        .where(versao_tabela.c.tabela.in_(tabelas))
+    ).all()
+    versoes = dict.fromkeys(tabelas, 0)
+    versoes.update(dict(linhas))
+    return versoes
+
+
+@event.listens_for(Session, 'before_flush')
+def _incrementar_versoes_alteradas(session, flush_context, instances):
+    """Incrementa a versão das tabelas alteradas neste flush"""
+    alterados = list(session.new) + list(session.deleted)
+    alterados += [obj for obj in session.dirty if session.is_modified(obj)]
+    alterados = [obj for obj in alterados if obj.__table__.name in TABELAS_VERSIONADAS]
+    if not alterados:
+        return
+
+    novas = incrementar_versoes(session.connection(), {obj.__table__.name for obj in alterados})
+
+    # Tabelas com coluna `versao` registram em cada linha a versão que a alterou
+    agora = datetime.utcnow()
+    for obj in alterados:
+        if obj not in session.deleted and 'versao' in obj.__table__.c:
+            obj.versao = novas[obj.__table__.name]
+            obj.atualizado_em = agora
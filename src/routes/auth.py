@@ -1,9 +1,32 @@
 from flask import Blueprint, jsonify, request, session
 from datetime import datetime
 from src.models.user import User, db
+from src.utils.cache_principal import cache_principal
+from src.utils.senhas import SobrecargaSenhas
+from src.utils.ultimo_login import buffer_ultimo_login
 
 auth_bp = Blueprint('auth', __name__)
 
+def carregar_principal(user_id):
+    """
+    Dados seguros e flag ativo do usuário da sessão, do cache quando possível.
+    Retorna (dados, ativo), ou None se o usuário não existe.
+    """
+    principal = cache_principal.obter(user_id)
+    if principal is None:
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        principal = (user.to_dict_safe(), user.ativo)
+        cache_principal.guardar(user_id, *principal)
+    return principal
+
+def resposta_sobrecarga():
+    """Resposta quando o limite de hashes de senha simultâneos foi atingido"""
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Rota para fazer login"""
@@ -23,9 +46,12 @@ def login():
             session['user_id'] = user.id
             session['username'] = user.username
             
-            # Atualizar último login
-            user.ultimo_login = datetime.utcnow()
-            db.session.commit()
+            # Último login é gravado em lote, em segundo plano; só há escrita
+            # aqui se o hash da senha foi refeito
+            buffer_ultimo_login.registrar(user.id, datetime.utcnow())
+            if db.session.is_modified(user):
+                db.session.commit()
+            cache_principal.guardar(user.id, user.to_dict_safe(), user.ativo)
             
             return jsonify({
                 'message': 'Login realizado com sucesso',
@@ -34,6 +60,8 @@ def login():
         else:
             return jsonify({'error': 'Credenciais inválidas'}), 401
             
+    except SobrecargaSenhas:
+        return resposta_sobrecarga()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -74,6 +102,8 @@ def register():
             'user': user.to_dict_safe()
         }), 201
         
+    except SobrecargaSenhas:
+        return resposta_sobrecarga()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -83,20 +113,20 @@ def get_current_user():
     if 'user_id' not in session:
         return jsonify({'error': 'Usuário não autenticado'}), 401
     
-    user = User.query.get(session['user_id'])
-    if not user or not user.ativo:
+    principal = carregar_principal(session['user_id'])
+    if not principal or not principal[1]:
         session.clear()
         return jsonify({'error': 'Usuário não encontrado'}), 401
     
-    return jsonify({'user': user.to_dict_safe()}), 200
+    return jsonify({'user': principal[0]}), 200
 
 @auth_bp.route('/check', methods=['GET'])
 def check_auth():
     """Verifica se o usuário está autenticado"""
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user and user.ativo:
-            return jsonify({'authenticated': True, 'user': user.to_dict_safe()}), 200
+        principal = carregar_principal(session['user_id'])
+        if principal and principal[1]:
+            return jsonify({'authenticated': True, 'user': principal[0]}), 200
     
     return jsonify({'authenticated': False}), 200
 
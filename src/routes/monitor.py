@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify, session
+from src.models.email_saida import EmailSaida
+from src.utils.cache_calendario import cache_calendario
+from src.utils.cache_principal import cache_principal
+from src.utils.compressao import compressao
+from src.utils.email_service import despacho_emails
+
+monitor_bp = Blueprint('monitor', __name__)
+
+def require_auth():
+    """Decorator para verificar autenticação"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+    return None
+
+@monitor_bp.route('/monitor/emails', methods=['GET'])
+def get_estatisticas_emails():
+    """Caixa de saída de emails e latência do envio neste processo"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    estatisticas = despacho_emails.estatisticas()
+    estatisticas['caixa_saida'] = EmailSaida.contagem_por_estado()
+    return jsonify(estatisticas), 200
+
+@monitor_bp.route('/monitor/caches', methods=['GET'])
+def get_estatisticas_caches():
+    """Acertos e tamanho dos caches deste processo"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    return jsonify({
+        'calendario': cache_calendario.estatisticas(),
+        'principal': cache_principal.estatisticas()
+    }), 200
+
+@monitor_bp.route('/monitor/compressao', methods=['GET'])
+def get_estatisticas_compressao():
+    """Bytes antes e depois da compressão, por endpoint, neste processo"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    return jsonify(compressao.estatisticas()), 200
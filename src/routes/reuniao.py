@@ -1,20 +1,158 @@
-from flask import Blueprint, jsonify, request, session
-from datetime import datetime, timedelta
-from src.models.reuniao import Reuniao
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+from functools import partial
+from datetime import date, datetime, timedelta
+from src.models.historico import ReuniaoHistorico
+from src.models.recorrencia import RegraRecorrencia
+from src.models.reuniao import BUFFER_REUNIAO, Reuniao, ao_confirmar_reunioes
 from src.models.sala import Sala
-from src.models.user import User, db
+from src.models.user import db
+from src.models.versao import obter_versoes
+from src.utils.cache_calendario import cache_calendario
+from src.utils.cache_http import etag_por_versao
+from src.utils.eventos import LimiteAssinantesExcedido, formatar_sse, hub_eventos
 from src.utils.email_service import enviar_notificacao_agendamento, enviar_notificacao_cancelamento
+from src.utils.intervalos import FUSO_HORARIO_PADRAO, conflitos_em_lote, horarios_livres, ler_data_hora, ler_fuso
+import base64
+import binascii
+import heapq
+import json
 import logging
+import queue
+import time
 
 reuniao_bp = Blueprint('reuniao', __name__)
 
+# Tamanho de página da listagem paginada de reuniões
+LIMITE_PAGINA_PADRAO = 100
+LIMITE_PAGINA_MAXIMO = 500
+
+# Reuniões carregadas por lote na listagem em streaming
+TAMANHO_LOTE_STREAM = 200
+
+# Acima disso a sincronização incremental pede uma recarga completa
+LIMITE_ALTERACOES = 500
+
+# Stream SSE: intervalo dos heartbeats e duração máxima de cada conexão
+# (o EventSource reconecta sozinho), em segundos
+INTERVALO_HEARTBEAT = 15
+DURACAO_MAXIMA_SSE = 300
+
+# Espera sugerida (Retry-After) quando o limite de conexões SSE é atingido
+ESPERA_RECONEXAO_SSE = 30
+
 def require_auth():
     """Decorator para verificar autenticação"""
     if 'user_id' not in session:
         return jsonify({'error': 'Usuário não autenticado'}), 401
     return None
 
+@ao_confirmar_reunioes
+def invalidar_calendario(alteracoes):
+    """Após o commit, invalida os meses dos intervalos antigos e novos"""
+    periodos = set()
+    for alteracao in alteracoes:
+        periodos.add((alteracao.data_inicio, alteracao.data_fim))
+        periodos.update(alteracao.anteriores)
+    cache_calendario.invalidar_periodos(periodos)
+
+def evento_reuniao(tipo, reuniao_id, versao, sala_id, data_inicio, data_fim):
+    """Evento de alteração de reunião enviado aos clientes SSE"""
+    return {
+        'tipo': tipo,
+        'id': reuniao_id,
+        'versao': versao,
+        'sala_id': sala_id,
+        'data_inicio': data_inicio.isoformat() if data_inicio else None,
+        'data_fim': data_fim.isoformat() if data_fim else None
+    }
+
+@ao_confirmar_reunioes
+def publicar_eventos(alteracoes):
+    """Após o commit, publica as alterações para os clientes SSE deste processo"""
+    if not hub_eventos.total_assinantes():
+        return
+    for alteracao in sorted(alteracoes, key=lambda a: a.versao):
+        if not alteracao.ativa:
+            tipo = 'cancelada'
+        elif alteracao.nova:
+            tipo = 'criada'
+        else:
+            tipo = 'atualizada'
+        hub_eventos.publicar(evento_reuniao(
+            tipo, alteracao.id, alteracao.versao, alteracao.sala_id,
+            alteracao.data_inicio, alteracao.data_fim
+        ))
+
+def consultar_eventos(app, desde):
+    """Alterações confirmadas por qualquer processo desde a versão `desde`"""
+    with app.app_context():
+        atual = obter_versoes(['reuniao'])['reuniao']
+        if desde is None or atual <= desde:
+            return atual, []
+        
+        linhas = db.session.query(
+            Reuniao.id, Reuniao.versao, Reuniao.ativa, Reuniao.sala_id, Reuniao.data_inicio, Reuniao.data_fim
+        ).filter(
+            Reuniao.versao > desde,
+            Reuniao.versao <= atual
+        ).order_by(Reuniao.versao).limit(LIMITE_ALTERACOES + 1).all()
+        
+        if len(linhas) > LIMITE_ALTERACOES:
+            return atual, [{'tipo': 'recarregar', 'id': None, 'versao': atual}]
+        
+        # Sem histórico não dá para distinguir criação de edição
+        return atual, [
+            evento_reuniao('atualizada' if ativa else 'cancelada', reuniao_id, versao, sala_id, data_inicio, data_fim)
+            for reuniao_id, versao, ativa, sala_id, data_inicio, data_fim in linhas
+        ]
+
+def chave_reuniao(reuniao):
+    """Ordem da listagem e do cursor de paginação"""
+    return (reuniao.data_inicio, reuniao.id)
+
+def mesclar_reunioes(listas):
+    """Junta listas já ordenadas (tabela ativa e histórico) mantendo a ordem"""
+    return list(heapq.merge(*listas, key=chave_reuniao))
+
+def stream_reunioes(*queries):
+    """
+    Resposta JSON em streaming: as queries (já ordenadas) são percorridas em
+    lotes com yield_per e cada reunião é serializada e enviada sem montar a
+    lista inteira.
+    """
+    def gerar():
+        yield '['
+        reunioes = heapq.merge(*(query.yield_per(TAMANHO_LOTE_STREAM) for query in queries), key=chave_reuniao)
+        for indice, reuniao in enumerate(reunioes):
+            yield (',' if indice else '') + current_app.json.dumps(reuniao.to_dict(), separators=(',', ':'))
+        yield ']\n'
+    
+    return Response(stream_with_context(gerar()), mimetype='application/json')
+
+def codificar_cursor(reuniao):
+    """Cursor opaco com a posição (data_inicio, id) da última reunião da página"""
+    valor = json.dumps([reuniao.data_inicio.isoformat(), reuniao.id])
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor; levanta ValueError para cursores inválidos"""
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data_inicio, reuniao_id = json.loads(valor)
+        return datetime.fromisoformat(data_inicio), int(reuniao_id)
+    except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Cursor inválido')
+
+def listar_indisponiveis(disponibilidade):
+    """Participantes ocupados no formato retornado pela API"""
+    return [
+        {'id': user.id, 'username': user.username, 'email': user.email}
+        for user_id, user in disponibilidade['usuarios'].items()
+        if user_id in disponibilidade['ocupados']
+    ]
+
 @reuniao_bp.route('/reunioes', methods=['GET'])
+@etag_por_versao('reuniao', 'sala', 'user')
 def get_reunioes():
     """Obter todas as reuniões ativas"""
     auth_error = require_auth()
@@ -27,21 +165,67 @@ def get_reunioes():
         data_fim = request.args.get('data_fim')
         sala_id = request.args.get('sala_id')
         
-        query = Reuniao.query.filter_by(ativa=True)
+        data_inicio_dt = ler_data_hora(data_inicio) if data_inicio else None
+        data_fim_dt = ler_data_hora(data_fim) if data_fim else None
         
-        if data_inicio:
-            data_inicio_dt = datetime.fromisoformat(data_inicio.replace('Z', '+00:00'))
-            query = query.filter(Reuniao.data_fim >= data_inicio_dt)
+        # Períodos antigos também incluem as reuniões arquivadas
+        modelos = [Reuniao]
+        if ReuniaoHistorico.cobre_periodo(data_inicio_dt):
+            modelos.append(ReuniaoHistorico)
         
-        if data_fim:
-            data_fim_dt = datetime.fromisoformat(data_fim.replace('Z', '+00:00'))
-            query = query.filter(Reuniao.data_inicio <= data_fim_dt)
-        
-        if sala_id:
-            query = query.filter_by(sala_id=sala_id)
+        consultas = []
+        for modelo in modelos:
+            query = modelo.query_serializacao().filter_by(ativa=True)
+            
+            if data_inicio_dt:
+                query = query.filter(modelo.data_fim >= data_inicio_dt)
+            
+            if data_fim_dt:
+                query = query.filter(modelo.data_inicio <= data_fim_dt)
+            
+            if sala_id:
+                query = query.filter_by(sala_id=sala_id)
+            
+            consultas.append((modelo, query))
+        
+        # Paginação por cursor (opcional): sem limit/cursor retorna tudo
+        limite = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        if limite is None and not cursor:
+            consultas = [query.order_by(modelo.data_inicio, modelo.id) for modelo, query in consultas]
+            if request.args.get('stream') in ('1', 'true'):
+                return stream_reunioes(*consultas)
+            reunioes = mesclar_reunioes(query.all() for query in consultas)
+            return jsonify([reuniao.to_dict() for reuniao in reunioes]), 200
+        
+        limite = max(1, min(limite or LIMITE_PAGINA_PADRAO, LIMITE_PAGINA_MAXIMO))
+        if cursor:
+            try:
+                cursor_inicio, cursor_id = decodificar_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            consultas = [(modelo, query.filter(
+                modelo.data_inicio >= cursor_inicio,
+                db.or_(
+                    modelo.data_inicio > cursor_inicio,
+                    modelo.id > cursor_id
+                )
+            )) for modelo, query in consultas]
+        
+        # Buscar um item a mais para saber se existe próxima página
+        reunioes = mesclar_reunioes(
+            query.order_by(modelo.data_inicio, modelo.id).limit(limite + 1).all()
+            for modelo, query in consultas
+        )[:limite + 1]
+        proximo = None
+        if len(reunioes) > limite:
+            reunioes = reunioes[:limite]
+            proximo = codificar_cursor(reunioes[-1])
         
-        reunioes = query.order_by(Reuniao.data_inicio).all()
-        return jsonify([reuniao.to_dict() for reuniao in reunioes]), 200
+        return jsonify({
+            'reunioes': [reuniao.to_dict() for reuniao in reunioes],
+            'next_cursor': proximo
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -68,8 +252,8 @@ def create_reuniao():
         
         # Converter strings para datetime
         try:
-            data_inicio = datetime.fromisoformat(data_inicio_str.replace('Z', '+00:00'))
-            data_fim = datetime.fromisoformat(data_fim_str.replace('Z', '+00:00'))
+            data_inicio = ler_data_hora(data_inicio_str)
+            data_fim = ler_data_hora(data_fim_str)
         except ValueError:
             return jsonify({'error': 'Formato de data inválido. Use ISO format'}), 400
         
@@ -98,22 +282,12 @@ def create_reuniao():
             }), 409
         
         # Verificar disponibilidade dos participantes
-        participantes_indisponiveis = []
-        participantes_validos = []
+        disponibilidade = Reuniao.verificar_disponibilidade_participantes(participantes_ids, data_inicio, data_fim)
+        if disponibilidade['invalidos']:
+            return jsonify({'error': f"Participante com ID {disponibilidade['invalidos'][0]} não encontrado"}), 400
         
-        for participante_id in participantes_ids:
-            user = User.query.get(participante_id)
-            if not user or not user.ativo:
-                return jsonify({'error': f'Participante com ID {participante_id} não encontrado'}), 400
-            
-            if not Reuniao.verificar_disponibilidade_participante(participante_id, data_inicio, data_fim):
-                participantes_indisponiveis.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email
-                })
-            else:
-                participantes_validos.append(user)
+        participantes_indisponiveis = listar_indisponiveis(disponibilidade)
+        participantes_validos = list(disponibilidade['usuarios'].values())
         
         if participantes_indisponiveis:
             return jsonify({
@@ -135,16 +309,20 @@ def create_reuniao():
         reuniao.participantes = participantes_validos
         
         db.session.add(reuniao)
-        db.session.commit()
+        db.session.flush()
         
-        # Enviar notificações por email
-        try:
-            if participantes_validos:
-                emails_enviados = enviar_notificacao_agendamento(reuniao, participantes_validos)
-                logging.info(f"Emails de agendamento enviados: {emails_enviados}/{len(participantes_validos)}")
-        except Exception as e:
-            logging.error(f"Erro ao enviar emails de agendamento: {str(e)}")
-            # Não falhar a criação da reunião por causa do email
+        # Notificações por email vão para a caixa de saída na mesma transação;
+        # se não puderem ser gravadas, a reunião também não é
+        if participantes_validos:
+            try:
+                emails_agendados = enviar_notificacao_agendamento(reuniao, participantes_validos)
+            except Exception:
+                logging.exception(f"Erro ao agendar emails de agendamento da reunião {reuniao.id}")
+                db.session.rollback()
+                raise
+            logging.info(f"Emails de agendamento agendados: {emails_agendados}/{len(participantes_validos)}")
+        
+        db.session.commit()
         
         return jsonify({
             'message': 'Reunião criada com sucesso',
@@ -155,6 +333,7 @@ def create_reuniao():
         return jsonify({'error': str(e)}), 500
 
 @reuniao_bp.route('/reunioes/<int:reuniao_id>', methods=['GET'])
+@etag_por_versao('reuniao', 'sala', 'user')
 def get_reuniao(reuniao_id):
     """Obter reunião específica"""
     auth_error = require_auth()
@@ -162,7 +341,10 @@ def get_reuniao(reuniao_id):
         return auth_error
     
     try:
-        reuniao = Reuniao.query.get_or_404(reuniao_id)
+        reuniao = Reuniao.query_serializacao().filter_by(id=reuniao_id).first()
+        if reuniao is None:
+            # Reuniões arquivadas continuam acessíveis pelo id
+            reuniao = ReuniaoHistorico.query_serializacao().get_or_404(reuniao_id)
         return jsonify(reuniao.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -195,7 +377,7 @@ def update_reuniao(reuniao_id):
         
         if 'data_inicio' in data:
             try:
-                nova_data_inicio = datetime.fromisoformat(data['data_inicio'].replace('Z', '+00:00'))
+                nova_data_inicio = ler_data_hora(data['data_inicio'])
                 if nova_data_inicio != reuniao.data_inicio:
                     reuniao.data_inicio = nova_data_inicio
                     data_inicio_alterada = True
@@ -204,7 +386,7 @@ def update_reuniao(reuniao_id):
         
         if 'data_fim' in data:
             try:
-                nova_data_fim = datetime.fromisoformat(data['data_fim'].replace('Z', '+00:00'))
+                nova_data_fim = ler_data_hora(data['data_fim'])
                 if nova_data_fim != reuniao.data_fim:
                     reuniao.data_fim = nova_data_fim
                     data_fim_alterada = True
@@ -228,25 +410,13 @@ def update_reuniao(reuniao_id):
         
         # Atualizar participantes se fornecidos
         if 'participantes' in data:
-            participantes_ids = data['participantes']
-            participantes_indisponiveis = []
-            participantes_validos = []
+            disponibilidade = Reuniao.verificar_disponibilidade_participantes(
+                data['participantes'], reuniao.data_inicio, reuniao.data_fim, reuniao_id
+            )
+            if disponibilidade['invalidos']:
+                return jsonify({'error': f"Participante com ID {disponibilidade['invalidos'][0]} não encontrado"}), 400
             
-            for participante_id in participantes_ids:
-                user = User.query.get(participante_id)
-                if not user or not user.ativo:
-                    return jsonify({'error': f'Participante com ID {participante_id} não encontrado'}), 400
-                
-                if not Reuniao.verificar_disponibilidade_participante(
-                    participante_id, reuniao.data_inicio, reuniao.data_fim, reuniao_id
-                ):
-                    participantes_indisponiveis.append({
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email
-                    })
-                else:
-                    participantes_validos.append(user)
+            participantes_indisponiveis = listar_indisponiveis(disponibilidade)
             
             if participantes_indisponiveis:
                 return jsonify({
@@ -254,7 +424,7 @@ def update_reuniao(reuniao_id):
                     'participantes_indisponiveis': participantes_indisponiveis
                 }), 409
             
-            reuniao.participantes = participantes_validos
+            reuniao.participantes = list(disponibilidade['usuarios'].values())
         
         db.session.commit()
         
@@ -284,23 +454,32 @@ def delete_reuniao(reuniao_id):
         participantes_para_notificar = list(reuniao.participantes)
         
         reuniao.ativa = False
-        db.session.commit()
         
-        # Enviar notificações de cancelamento por email
-        try:
-            if participantes_para_notificar:
-                emails_enviados = enviar_notificacao_cancelamento(reuniao, participantes_para_notificar)
-                logging.info(f"Emails de cancelamento enviados: {emails_enviados}/{len(participantes_para_notificar)}")
-        except Exception as e:
-            logging.error(f"Erro ao enviar emails de cancelamento: {str(e)}")
-            # Não falhar o cancelamento por causa do email
+        # Notificações de cancelamento vão para a caixa de saída na mesma
+        # transação; se não puderem ser gravadas, o cancelamento também não é
+        if participantes_para_notificar:
+            try:
+                emails_agendados = enviar_notificacao_cancelamento(reuniao, participantes_para_notificar)
+            except Exception:
+                logging.exception(f"Erro ao agendar emails de cancelamento da reunião {reuniao_id}")
+                db.session.rollback()
+                raise
+            logging.info(f"Emails de cancelamento agendados: {emails_agendados}/{len(participantes_para_notificar)}")
+        
+        db.session.commit()
         
         return jsonify({'message': 'Reunião cancelada com sucesso'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def mes_calendario():
+    """(ano, mes) pedidos ao calendário; sem parâmetros, o mês atual"""
+    hoje = datetime.now()
+    return request.args.get('ano', hoje.year, type=int), request.args.get('mes', hoje.month, type=int)
+
 @reuniao_bp.route('/reunioes/calendario', methods=['GET'])
+@etag_por_versao('reuniao', 'sala', 'user', chave=mes_calendario)
 def get_calendario():
     """Obter reuniões para exibição em calendário"""
     auth_error = require_auth()
@@ -309,8 +488,7 @@ def get_calendario():
     
     try:
         # Parâmetros para filtrar por mês/ano
-        ano = request.args.get('ano', datetime.now().year, type=int)
-        mes = request.args.get('mes', datetime.now().month, type=int)
+        ano, mes = mes_calendario()
         
         # Calcular início e fim do mês
         inicio_mes = datetime(ano, mes, 1)
@@ -319,26 +497,18 @@ def get_calendario():
         else:
             fim_mes = datetime(ano, mes + 1, 1) - timedelta(days=1)
         
-        reunioes = Reuniao.query.filter(
-            Reuniao.ativa == True,
-            Reuniao.data_inicio <= fim_mes,
-            Reuniao.data_fim >= inicio_mes
-        ).order_by(Reuniao.data_inicio).all()
-        
-        # Formatar para calendário
-        eventos = []
-        for reuniao in reunioes:
-            eventos.append({
-                'id': reuniao.id,
-                'title': reuniao.titulo,
-                'start': reuniao.data_inicio.isoformat(),
-                'end': reuniao.data_fim.isoformat(),
-                'sala': reuniao.sala_reuniao.nome,
-                'participantes_count': len(reuniao.participantes),
-                'criador': reuniao.criador.username
-            })
+        corpo, geracao = cache_calendario.obter(ano, mes)
+        if corpo is None:
+            eventos = Reuniao.eventos_calendario(inicio_mes, fim_mes)
+            if ReuniaoHistorico.cobre_periodo(inicio_mes):
+                eventos = list(heapq.merge(
+                    ReuniaoHistorico.eventos_calendario(inicio_mes, fim_mes), eventos,
+                    key=lambda evento: evento['start']
+                ))
+            corpo = current_app.json.dumps(eventos, separators=(',', ':')) + '\n'
+            cache_calendario.guardar(ano, mes, corpo, geracao)
         
-        return jsonify(eventos), 200
+        return Response(corpo, mimetype='application/json'), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -363,8 +533,8 @@ def verificar_conflito():
         
         # Converter strings para datetime
         try:
-            data_inicio = datetime.fromisoformat(data_inicio_str.replace('Z', '+00:00'))
-            data_fim = datetime.fromisoformat(data_fim_str.replace('Z', '+00:00'))
+            data_inicio = ler_data_hora(data_inicio_str)
+            data_fim = ler_data_hora(data_fim_str)
         except ValueError:
             return jsonify({'error': 'Formato de data inválido'}), 400
         
@@ -372,16 +542,10 @@ def verificar_conflito():
         conflitos_sala = Reuniao.verificar_conflito_horario(sala_id, data_inicio, data_fim, reuniao_id)
         
         # Verificar disponibilidade dos participantes
-        participantes_indisponiveis = []
-        for participante_id in participantes_ids:
-            if not Reuniao.verificar_disponibilidade_participante(participante_id, data_inicio, data_fim, reuniao_id):
-                user = User.query.get(participante_id)
-                if user:
-                    participantes_indisponiveis.append({
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email
-                    })
+        disponibilidade = Reuniao.verificar_disponibilidade_participantes(
+            participantes_ids, data_inicio, data_fim, reuniao_id
+        )
+        participantes_indisponiveis = listar_indisponiveis(disponibilidade)
         
         return jsonify({
             'conflitos_sala': [{'titulo': c.titulo, 'data_inicio': c.data_inicio.isoformat(), 'data_fim': c.data_fim.isoformat()} for c in conflitos_sala],
@@ -392,3 +556,380 @@ def verificar_conflito():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@reuniao_bp.route('/reunioes/horarios-livres', methods=['GET'])
+def get_horarios_livres():
+    """Sugerir horários livres para a sala e os participantes"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        sala_id = request.args.get('sala_id', type=int)
+        duracao = request.args.get('duracao', type=int)  # Em minutos
+        limite = min(request.args.get('limite', 5, type=int), 50)
+        fim_de_semana = request.args.get('fim_de_semana', '0') in ('1', 'true')
+        
+        if not sala_id or not duracao or duracao <= 0:
+            return jsonify({'error': 'Sala e duração (em minutos) são obrigatórios'}), 400
+        
+        # Participantes como lista separada por vírgula ou parâmetro repetido
+        participantes_ids = []
+        for valor in request.args.getlist('participantes'):
+            for parte in valor.split(','):
+                if parte.strip():
+                    participantes_ids.append(parte.strip())
+        
+        try:
+            participantes_ids = [int(p) for p in participantes_ids]
+            inicio_str = request.args.get('inicio')
+            fim_str = request.args.get('fim')
+            inicio = ler_data_hora(inicio_str) if inicio_str else datetime.utcnow()
+            fim = ler_data_hora(fim_str) if fim_str else inicio + timedelta(days=14)
+            hora_inicio = datetime.strptime(request.args.get('hora_inicio', '08:00'), '%H:%M').time()
+            hora_fim = datetime.strptime(request.args.get('hora_fim', '18:00'), '%H:%M').time()
+            # Expediente no horário local do usuário (ex.: America/Sao_Paulo ou -03:00)
+            fuso = ler_fuso(request.args.get('fuso') or FUSO_HORARIO_PADRAO)
+        except ValueError:
+            return jsonify({'error': 'Parâmetros inválidos. Use ISO format para datas, HH:MM para horários '
+                                     'e um fuso IANA ou deslocamento (±HH:MM)'}), 400
+        
+        if fim <= inicio or hora_fim <= hora_inicio:
+            return jsonify({'error': 'Janela de busca ou expediente inválido'}), 400
+        
+        if fim - inicio > timedelta(days=90):
+            return jsonify({'error': 'Janela de busca limitada a 90 dias'}), 400
+        
+        sala = Sala.query.get(sala_id)
+        if not sala or not sala.ativa:
+            return jsonify({'error': 'Sala não encontrada ou inativa'}), 400
+        
+        ocupados = Reuniao.intervalos_ocupados(sala_id, participantes_ids, inicio, fim)
+        livres = horarios_livres(
+            ocupados, inicio, fim, timedelta(minutes=duracao),
+            hora_inicio, hora_fim, limite, fim_de_semana=fim_de_semana, fuso=fuso
+        )
+        
+        return jsonify({
+            'sala_id': sala_id,
+            'duracao': duracao,
+            'horarios': [{
+                'data_inicio': lacuna_inicio.isoformat(),
+                'data_fim': (lacuna_inicio + timedelta(minutes=duracao)).isoformat(),
+                'livre_ate': lacuna_fim.isoformat()
+            } for lacuna_inicio, lacuna_fim in livres]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def ler_inteiro(valor):
+    """Inteiro de um campo JSON (número ou texto numérico); None se ausente"""
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        raise ValueError(f'Valor inteiro inválido: {valor!r}')
+    return int(valor)
+
+@reuniao_bp.route('/reunioes/serie', methods=['POST'])
+def create_serie():
+    """Criar série de reuniões recorrentes"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.json
+        titulo = data.get('titulo')
+        descricao = data.get('descricao', '')
+        data_inicio_str = data.get('data_inicio')
+        data_fim_str = data.get('data_fim')
+        sala_id = data.get('sala_id')
+        participantes_ids = data.get('participantes', [])
+        recorrencia = data.get('recorrencia') or {}
+        pular_conflitos = bool(data.get('pular_conflitos', False))
+        
+        # Validações básicas
+        if not titulo or not data_inicio_str or not data_fim_str or not sala_id:
+            return jsonify({'error': 'Título, data de início, data de fim e sala são obrigatórios'}), 400
+        
+        try:
+            data_inicio = ler_data_hora(data_inicio_str)
+            data_fim = ler_data_hora(data_fim_str)
+            ate = date.fromisoformat(recorrencia['ate']) if recorrencia.get('ate') else None
+            excecoes = [date.fromisoformat(d).isoformat() for d in recorrencia.get('excecoes', [])]
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Formato de data inválido. Use ISO format'}), 400
+        
+        try:
+            intervalo = ler_inteiro(recorrencia.get('intervalo', 1))
+            contagem = ler_inteiro(recorrencia.get('contagem'))
+            dias_semana = recorrencia.get('dias_semana')
+            if dias_semana is not None:
+                if not isinstance(dias_semana, list):
+                    raise ValueError('dias_semana deve ser uma lista')
+                dias_semana = [ler_inteiro(d) for d in dias_semana]
+        except ValueError:
+            return jsonify({'error': 'Intervalo, quantidade de ocorrências e dias da semana devem ser números inteiros'}), 400
+        
+        if data_fim <= data_inicio:
+            return jsonify({'error': 'Data de fim deve ser posterior à data de início'}), 400
+        
+        regra = RegraRecorrencia(
+            frequencia=recorrencia.get('frequencia'),
+            intervalo=intervalo,
+            dias_semana=dias_semana,
+            contagem=contagem,
+            ate=ate,
+            excecoes=excecoes,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            criador_id=session['user_id']
+        )
+        erro = regra.validar()
+        if erro:
+            return jsonify({'error': erro}), 400
+        
+        ocorrencias = regra.expandir()
+        if not ocorrencias:
+            return jsonify({'error': 'A regra de recorrência não gera nenhuma ocorrência'}), 400
+        
+        # Ocorrências da própria série não podem se sobrepor (com buffer)
+        for anterior, seguinte in zip(ocorrencias, ocorrencias[1:]):
+            if seguinte[0] < anterior[1] + BUFFER_REUNIAO:
+                return jsonify({'error': 'Ocorrências da série se sobrepõem; aumente o intervalo'}), 400
+        
+        sala = Sala.query.get(sala_id)
+        if not sala or not sala.ativa:
+            return jsonify({'error': 'Sala não encontrada ou inativa'}), 400
+        sala_id = sala.id
+        
+        usuarios, invalidos = Reuniao.carregar_participantes(participantes_ids)
+        if invalidos:
+            return jsonify({'error': f'Participante com ID {invalidos[0]} não encontrado'}), 400
+        
+        # Um único conjunto de intervalos para todas as ocorrências
+        ocupados = []
+        for reuniao_id, reuniao_titulo, inicio, fim, reuniao_sala_id, user_id in Reuniao.ocupacoes(
+            sala_id, list(usuarios), ocorrencias[0][0], ocorrencias[-1][1]
+        ):
+            info = {'titulo': reuniao_titulo, 'data_inicio': inicio.isoformat(), 'data_fim': fim.isoformat()}
+            if reuniao_sala_id == sala_id:
+                ocupados.append((inicio - BUFFER_REUNIAO, fim + BUFFER_REUNIAO, ('sala', reuniao_id, info)))
+            if user_id in usuarios:
+                ocupados.append((inicio, fim, ('participante', user_id, info)))
+        
+        conflitos = []
+        livres = []
+        for indice, (ocorrencia, encontrados) in enumerate(zip(ocorrencias, conflitos_em_lote(ocorrencias, ocupados))):
+            if not encontrados:
+                livres.append(ocorrencia)
+                continue
+            conflitos_sala = {}
+            ocupados_ids = []
+            for tipo, chave, info in encontrados:
+                if tipo == 'sala':
+                    conflitos_sala[chave] = info
+                elif chave not in ocupados_ids:
+                    ocupados_ids.append(chave)
+            conflitos.append({
+                'indice': indice,
+                'data_inicio': ocorrencia[0].isoformat(),
+                'data_fim': ocorrencia[1].isoformat(),
+                'conflitos_sala': list(conflitos_sala.values()),
+                'participantes_indisponiveis': [
+                    {'id': usuarios[u].id, 'username': usuarios[u].username, 'email': usuarios[u].email}
+                    for u in ocupados_ids
+                ]
+            })
+        
+        if conflitos and not pular_conflitos:
+            return jsonify({
+                'error': 'Algumas ocorrências da série têm conflito de horário',
+                'ocorrencias_em_conflito': conflitos,
+                'total_ocorrencias': len(ocorrencias)
+            }), 409
+        
+        if not livres:
+            return jsonify({
+                'error': 'Todas as ocorrências da série têm conflito de horário',
+                'ocorrencias_em_conflito': conflitos,
+                'total_ocorrencias': len(ocorrencias)
+            }), 409
+        
+        # Criar todas as ocorrências em uma única transação
+        participantes_validos = list(usuarios.values())
+        reunioes = []
+        for inicio, fim in livres:
+            reuniao = Reuniao(
+                titulo=titulo,
+                descricao=descricao,
+                data_inicio=inicio,
+                data_fim=fim,
+                sala_id=sala_id,
+                criador_id=session['user_id']
+            )
+            reuniao.participantes = participantes_validos
+            reunioes.append(reuniao)
+        
+        regra.reunioes = reunioes
+        db.session.add(regra)
+        db.session.add_all(reunioes)
+        db.session.flush()
+        
+        # Montar a resposta antes do commit, que expira os objetos
+        serie_dict = regra.to_dict()
+        reunioes_criadas = [{
+            'id': r.id,
+            'data_inicio': r.data_inicio.isoformat(),
+            'data_fim': r.data_fim.isoformat()
+        } for r in reunioes]
+        
+        # Notificar uma única vez, com a regra e as datas da série; se a
+        # notificação não puder ser gravada, a série também não é
+        if participantes_validos:
+            try:
+                emails_agendados = enviar_notificacao_agendamento(
+                    reunioes[0], participantes_validos, serie=regra, reunioes_serie=reunioes,
+                    ignoradas=[ocorrencias[c['indice']][0] for c in conflitos]
+                )
+            except Exception:
+                logging.exception(f"Erro ao agendar emails de agendamento da série (reunião {reunioes[0].id})")
+                db.session.rollback()
+                raise
+            logging.info(f"Emails de agendamento de série agendados: {emails_agendados}/{len(participantes_validos)}")
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Série de reuniões criada com sucesso',
+            'serie': serie_dict,
+            'reunioes': reunioes_criadas,
+            'ocorrencias_ignoradas': conflitos
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reuniao_bp.route('/reunioes/alteracoes', methods=['GET'])
+def get_alteracoes():
+    """
+    Sincronização incremental: reuniões criadas, alteradas ou canceladas
+    desde o token informado. Sem `desde`, retorna apenas o token atual,
+    que o cliente deve obter antes da carga completa.
+    """
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        # O contador só avança com a transação confirmada; linhas com versão
+        # até ele já estão visíveis
+        atual = obter_versoes(['reuniao'])['reuniao']
+        
+        desde = request.args.get('desde')
+        if desde is None:
+            return jsonify({'token': str(atual), 'alteracoes': [], 'recarregar': False}), 200
+        
+        try:
+            desde = int(desde)
+        except ValueError:
+            return jsonify({'error': 'Token inválido'}), 400
+        
+        if desde > atual:
+            # Token de outro banco ou de antes de uma restauração
+            return jsonify({'token': str(atual), 'alteracoes': [], 'recarregar': True}), 200
+        
+        # Reuniões arquivadas mantêm a versão da última alteração
+        reunioes = list(heapq.merge(*(
+            modelo.query_serializacao().filter(
+                modelo.versao > desde,
+                modelo.versao <= atual
+            ).order_by(modelo.versao, modelo.id).limit(LIMITE_ALTERACOES + 1).all()
+            for modelo in (Reuniao, ReuniaoHistorico)
+        ), key=lambda reuniao: (reuniao.versao, reuniao.id)))
+        
+        # Muitas alterações: uma carga completa sai mais barata
+        if len(reunioes) > LIMITE_ALTERACOES:
+            return jsonify({'token': str(atual), 'alteracoes': [], 'recarregar': True}), 200
+        
+        alteracoes = []
+        for reuniao in reunioes:
+            if reuniao.ativa:
+                alteracoes.append({'tipo': 'atualizada', 'versao': reuniao.versao, 'reuniao': reuniao.to_dict()})
+            else:
+                # Tombstone: basta o id para o cliente remover a reunião
+                alteracoes.append({'tipo': 'cancelada', 'versao': reuniao.versao, 'id': reuniao.id})
+        
+        return jsonify({'token': str(atual), 'alteracoes': alteracoes, 'recarregar': False}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reuniao_bp.route('/reunioes/eventos', methods=['GET'])
+def stream_eventos():
+    """Stream SSE com as reuniões criadas, alteradas e canceladas"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    
+    # Na reconexão o EventSource envia o último id recebido (a versão); um
+    # cliente que abre um stream novo pode informá-lo em `desde`
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    try:
+        desde = int(desde) if desde else None
+    except ValueError:
+        desde = None
+    
+    app = current_app._get_current_object()
+    hub_eventos.configurar(partial(consultar_eventos, app))
+    try:
+        assinatura = hub_eventos.assinar()
+    except LimiteAssinantesExcedido:
+        response = jsonify({'error': 'Limite de conexões em tempo real atingido'})
+        response.headers['Retry-After'] = str(ESPERA_RECONEXAO_SSE)
+        return response, 503
+    
+    # Alterações perdidas durante a reconexão, consultadas depois da
+    # assinatura para não deixar lacuna; o que chegar repetido pela fila é ignorado
+    try:
+        atual, pendentes = consultar_eventos(app, desde)
+    except Exception:
+        hub_eventos.cancelar(assinatura)
+        raise
+    ultima_enviada = 0
+    if desde is not None:
+        if desde > atual:
+            # Id de outro banco ou de antes de uma restauração
+            pendentes = [{'tipo': 'recarregar', 'id': None, 'versao': atual}]
+        ultima_enviada = max([min(desde, atual)] + [evento['versao'] for evento in pendentes])
+    
+    def gerar():
+        # O gerador não usa o banco nem o contexto da requisição, então a
+        # conexão SSE ocupa apenas uma thread, sem segurar sessão do banco
+        limite = time.monotonic() + DURACAO_MAXIMA_SSE
+        try:
+            # Um id sem dados não gera evento, mas é o Last-Event-ID da
+            # próxima reconexão mesmo que nada mude neste stream
+            yield f'retry: 5000\nid: {atual}\n\n'
+            for evento in pendentes:
+                yield formatar_sse(evento, nome=evento['tipo'], evento_id=evento['versao'])
+            while time.monotonic() < limite:
+                if assinatura.atrasada:
+                    yield formatar_sse({}, nome='recarregar')
+                    return
+                try:
+                    evento = assinatura.fila.get(timeout=INTERVALO_HEARTBEAT)
+                except queue.Empty:
+                    yield formatar_sse(comentario='heartbeat')
+                    continue
+                if evento['versao'] <= ultima_enviada:
+                    continue
+                yield formatar_sse(evento, nome=evento['tipo'], evento_id=evento['versao'])
+        finally:
+            hub_eventos.cancelar(assinatura)
+    
+    return Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.sala import Sala
 from src.models.user import db
+from src.utils.cache_calendario import cache_calendario
+from src.utils.cache_http import etag_por_versao
 
 sala_bp = Blueprint('sala', __name__)
 
@@ -11,6 +13,7 @@ def require_auth():
     return None
 
 @sala_bp.route('/salas', methods=['GET'])
+@etag_por_versao('sala')
 def get_salas():
     """Obter todas as salas ativas"""
     auth_error = require_auth()
@@ -93,6 +96,9 @@ def update_sala(sala_id):
         
         db.session.commit()
         
+        # O calendário exibe o nome da sala
+        cache_calendario.limpar()
+        
         return jsonify({
             'message': 'Sala atualizada com sucesso',
             'sala': sala.to_dict()
@@ -1,9 +1,14 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.models.versao import VERSAO_ULTIMO_LOGIN
+from src.utils.cache_calendario import cache_calendario
+from src.utils.cache_http import etag_por_versao
+from src.utils.cache_principal import cache_principal
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
+@etag_por_versao('user', VERSAO_ULTIMO_LOGIN, requer_login=False)
 def get_users():
     users = User.query.all()
     return jsonify([user.to_dict() for user in users])
@@ -29,6 +34,9 @@ def update_user(user_id):
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
     db.session.commit()
+    cache_principal.invalidar(user_id)
+    # O calendário exibe o nome do criador
+    cache_calendario.limpar()
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
@@ -36,4 +44,6 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    cache_principal.invalidar(user_id)
+    cache_calendario.limpar()
     return '', 204
@@ -4,6 +4,9 @@ let salas = [];
 let usuarios = [];
 let participantesSelecionados = [];
 let calendar = null;
+let fonteEventos = null;
+let ultimoEventoId = null;
+let recarregarCalendarioTimer = null;
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', function() {
@@ -94,6 +97,11 @@ async function logout() {
 
 // Mostrar tela de login
 function showLoginScreen() {
+    if (fonteEventos) {
+        fonteEventos.close();
+        fonteEventos = null;
+    }
+    ultimoEventoId = null;
     document.getElementById('loginScreen').classList.remove('hidden');
     document.getElementById('mainApp').classList.add('hidden');
     document.getElementById('username').value = '';
@@ -385,6 +393,69 @@ function loadCalendar() {
     });
     
     calendar.render();
+    escutarAlteracoes();
+}
+
+// Atualizações em tempo real das reuniões (Server-Sent Events)
+function escutarAlteracoes() {
+    if (fonteEventos || !window.EventSource) {
+        return;
+    }
+    
+    // Um stream novo recebe do servidor o que mudou desde o último evento visto
+    const url = ultimoEventoId ? `/api/reunioes/eventos?desde=${ultimoEventoId}` : '/api/reunioes/eventos';
+    fonteEventos = new EventSource(url);
+    ['criada', 'atualizada', 'cancelada', 'recarregar'].forEach(tipo => {
+        fonteEventos.addEventListener(tipo, (evento) => {
+            if (evento.lastEventId) {
+                ultimoEventoId = evento.lastEventId;
+            }
+            agendarRecargaCalendario();
+        });
+    });
+    
+    // Recusada pelo servidor (ex.: 503 no limite de conexões): o navegador
+    // não reconecta sozinho; até conseguir um stream, consulta as alterações
+    const fonte = fonteEventos;
+    fonte.onerror = () => {
+        if (fonte.readyState !== EventSource.CLOSED || fonteEventos !== fonte) {
+            return;
+        }
+        fonteEventos = null;
+        setTimeout(consultarAlteracoes, 30000 + Math.random() * 30000);
+    };
+}
+
+// Alternativa ao SSE: sincronização incremental pelo token de versão
+async function consultarAlteracoes() {
+    if (document.getElementById('mainApp').classList.contains('hidden')) {
+        return;
+    }
+    try {
+        const url = ultimoEventoId ? `/api/reunioes/alteracoes?desde=${ultimoEventoId}` : '/api/reunioes/alteracoes';
+        const response = await fetch(url);
+        if (response.ok) {
+            const data = await response.json();
+            // Sem token anterior não há como saber o que mudou: recarregar
+            if (!ultimoEventoId || data.recarregar || data.alteracoes.length) {
+                agendarRecargaCalendario();
+            }
+            ultimoEventoId = data.token;
+        }
+    } catch (error) {
+        console.error('Erro ao consultar alterações:', error);
+    }
+    escutarAlteracoes();
+}
+
+// Agrupa rajadas de eventos em uma única recarga do calendário
+function agendarRecargaCalendario() {
+    clearTimeout(recarregarCalendarioTimer);
+    recarregarCalendarioTimer = setTimeout(() => {
+        if (calendar) {
+            calendar.refetchEvents();
+        }
+    }, 500);
 }
 
 // Mostrar detalhes do evento
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from src.models.historico import ReuniaoHistorico, participantes_reuniao_historico
+from src.models.recorrencia import reunioes_serie
+from src.models.reuniao import Reuniao, indice_salas, participantes_reuniao
+from src.models.user import db
+import logging
+import os
+
+# Reuniões que terminaram há mais dias que isso vão para o histórico
+ARQUIVO_HORIZONTE_DIAS = int(os.environ.get('ARQUIVO_HORIZONTE_DIAS', 90))
+
+# Reuniões canceladas ficam este tempo em `reuniao` para a sincronização
+# incremental e o SSE ainda entregarem o cancelamento aos clientes
+CARENCIA_CANCELAMENTO = timedelta(days=1)
+
+TAMANHO_LOTE_ARQUIVO = 500
+
+
+def _arquivar_lote(conn, ids):
+    """Copia as reuniões e seus participantes para o histórico e as remove de `reuniao`"""
+    reuniao = Reuniao.__table__
+    historico = ReuniaoHistorico.__table__
+    agora = datetime.utcnow()
+
+    serie_id = db.select(reunioes_serie.c.serie_id).where(
+        reunioes_serie.c.reuniao_id == reuniao.c.id
+    ).scalar_subquery()
+    colunas = ['id', 'titulo', 'descricao', 'data_inicio', 'data_fim', 'criado_em', 'ativa',
+               'atualizado_em', 'versao', 'sala_id', 'criador_id']
+    conn.execute(historico.insert().from_select(
+        colunas + ['serie_id', 'arquivado_em'],
+        db.select(*[reuniao.c[c] for c in colunas], serie_id, db.literal(agora)).where(reuniao.c.id.in_(ids))
+    ))
+    conn.execute(participantes_reuniao_historico.insert().from_select(
+        ['reuniao_id', 'user_id'],
+        db.select(participantes_reuniao.c.reuniao_id, participantes_reuniao.c.user_id)
+        .where(participantes_reuniao.c.reuniao_id.in_(ids))
+    ))
+    conn.execute(reunioes_serie.delete().where(reunioes_serie.c.reuniao_id.in_(ids)))
+    conn.execute(participantes_reuniao.delete().where(participantes_reuniao.c.reuniao_id.in_(ids)))
+    conn.execute(reuniao.delete().where(reuniao.c.id.in_(ids)))
+
+
+def arquivar_reunioes(horizonte_dias=ARQUIVO_HORIZONTE_DIAS, tamanho_lote=TAMANHO_LOTE_ARQUIVO):
+    """
+    Move para o histórico as reuniões que terminaram antes do horizonte e as
+    canceladas, em transações de até `tamanho_lote` reuniões, para não
+    segurar o lock de escrita do banco por muito tempo. Retorna o total movido.
+
+    O conteúdo visível não muda (as leituras juntam o histórico), então as
+    versões das tabelas não são incrementadas.
+    """
+    agora = datetime.utcnow()
+    limite = agora - timedelta(days=horizonte_dias)
+    arquivaveis = db.or_(
+        Reuniao.data_fim < limite,
+        db.and_(
+            Reuniao.ativa == False,
+            db.func.coalesce(Reuniao.atualizado_em, Reuniao.criado_em) < agora - CARENCIA_CANCELAMENTO
+        )
+    )
+
+    total = 0
+    salas = set()
+    while True:
+        with db.engine.begin() as conn:
+            linhas = conn.execute(
+                db.select(Reuniao.id, Reuniao.sala_id).where(arquivaveis)
+                .order_by(Reuniao.id).limit(tamanho_lote)
+            ).all()
+            if not linhas:
+                break
+            _arquivar_lote(conn, [linha.id for linha in linhas])
+        total += len(linhas)
+        salas.update(linha.sala_id for linha in linhas)
+        logging.info(f"Arquivadas {total} reuniões até agora")
+        if len(linhas) < tamanho_lote:
+            break
+
+    # Os demais processos descartam o índice pelo TTL; só saem dele reuniões
+    # passadas ou canceladas, que não afetam novos agendamentos
+    for sala_id in salas:
+        indice_salas.invalidar(sala_id)
+    return total
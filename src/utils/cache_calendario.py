@@ -0,0 +1,296 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+# Validade das entradas do backend em memória, em segundos: invalidações
+# feitas por outros processos só chegam a ele por expiração
+CACHE_CALENDARIO_TTL = 30
+
+
+def meses_do_periodo(inicio, fim):
+    """Lista de (ano, mes) tocados pelo intervalo [inicio, fim]"""
+    meses = []
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        meses.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+class BackendMemoria:
+    """
+    Backend local do processo, com despejo LRU e validade de `ttl`
+    segundos. As invalidações só alcançam o processo que fez a escrita;
+    com vários workers ou servidores, os demais servem um mês desatualizado
+    por até `ttl` segundos. Adequado apenas para um único processo.
+    """
+
+    def __init__(self, tamanho_maximo=120, ttl=CACHE_CALENDARIO_TTL):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._geracoes = {}
+        self._lock = Lock()
+
+    def ler(self, chave):
+        """(valor ou None, geração da chave)"""
+        with self._lock:
+            geracao = self._geracoes.get(chave, 0)
+            item = self._itens.get(chave)
+            if item is None:
+                return None, geracao
+            valor, guardado_em = item
+            if time.monotonic() - guardado_em >= self.ttl:
+                del self._itens[chave]
+                return None, geracao
+            self._itens.move_to_end(chave)
+            return valor, geracao
+
+    def guardar(self, chave, valor, geracao):
+        """Guarda o valor se a chave não foi invalidada desde `geracao`"""
+        with self._lock:
+            if self._geracoes.get(chave, 0) != geracao:
+                return False
+            self._itens[chave] = (valor, time.monotonic())
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+            return True
+
+    def invalidar(self, chaves):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            for chave in list(self._itens):
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class BackendSQLite:
+    """
+    Backend compartilhado em um arquivo SQLite local, para que vários
+    workers do gunicorn enxerguem as mesmas entradas e invalidações.
+    O arquivo é local à máquina: com mais de um servidor, cada um precisa
+    do backend em memória (com TTL) ou de um arquivo em disco compartilhado.
+
+    Cada processo mantém uma única conexão, usada pelas threads sob um lock.
+    Um acerto é uma única consulta; o horário de acesso (para o LRU) só é
+    regravado quando tem mais de `intervalo_acesso` segundos.
+    """
+
+    def __init__(self, caminho, tamanho_maximo=120, intervalo_acesso=5):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.intervalo_acesso = intervalo_acesso
+        self._conn = None
+        self._pid = None
+        self._lock = Lock()
+
+        # Conexão temporária: o app pode ser criado antes do fork (--preload)
+        # e conexões SQLite não devem atravessar o fork
+        conn = self._conectar()
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_calendario ('
+                         'chave TEXT PRIMARY KEY, valor TEXT NOT NULL, acessado_em REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_calendario_geracao ('
+                         'chave TEXT PRIMARY KEY, geracao INTEGER NOT NULL)')
+        finally:
+            conn.close()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Arquivo descartável: perder as últimas escritas numa queda não importa
+        conn.execute('PRAGMA synchronous=OFF')
+        return conn
+
+    def _executar(self, funcao):
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = self._conectar()
+                self._pid = os.getpid()
+            try:
+                return funcao(self._conn)
+            except sqlite3.Error:
+                # A próxima chamada abre uma conexão nova
+                conn, self._conn = self._conn, None
+                conn.close()
+                raise
+
+    def ler(self, chave):
+        """(valor ou None, geração da chave) em uma única consulta"""
+        def consulta(conn):
+            geracao, valor, acessado_em = conn.execute(
+                'SELECT COALESCE(g.geracao, 0), c.valor, c.acessado_em FROM (SELECT ? AS chave) k '
+                'LEFT JOIN cache_calendario_geracao g ON g.chave = k.chave '
+                'LEFT JOIN cache_calendario c ON c.chave = k.chave', (chave,)
+            ).fetchone()
+            agora = time.time()
+            if valor is not None and agora - acessado_em > self.intervalo_acesso:
+                conn.execute('UPDATE cache_calendario SET acessado_em = ? WHERE chave = ?', (agora, chave))
+            return valor, geracao
+        return self._executar(consulta)
+
+    def guardar(self, chave, valor, geracao):
+        def gravar(conn):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                linha = conn.execute('SELECT geracao FROM cache_calendario_geracao WHERE chave = ?', (chave,)).fetchone()
+                if (linha[0] if linha else 0) != geracao:
+                    conn.execute('ROLLBACK')
+                    return False
+                conn.execute('INSERT OR REPLACE INTO cache_calendario (chave, valor, acessado_em) VALUES (?, ?, ?)',
+                             (chave, valor, time.time()))
+                conn.execute('DELETE FROM cache_calendario WHERE chave NOT IN ('
+                             'SELECT chave FROM cache_calendario ORDER BY acessado_em DESC LIMIT ?)',
+                             (self.tamanho_maximo,))
+                conn.execute('COMMIT')
+                return True
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return self._executar(gravar)
+
+    def invalidar(self, chaves):
+        def gravar(conn):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for chave in chaves:
+                    conn.execute('DELETE FROM cache_calendario WHERE chave = ?', (chave,))
+                    conn.execute('INSERT INTO cache_calendario_geracao (chave, geracao) VALUES (?, 1) '
+                                 'ON CONFLICT(chave) DO UPDATE SET geracao = geracao + 1', (chave,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        self._executar(gravar)
+
+    def limpar(self):
+        def gravar(conn):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('INSERT OR IGNORE INTO cache_calendario_geracao (chave, geracao) '
+                             'SELECT chave, 0 FROM cache_calendario')
+                conn.execute('UPDATE cache_calendario_geracao SET geracao = geracao + 1')
+                conn.execute('DELETE FROM cache_calendario')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        self._executar(gravar)
+
+    def __len__(self):
+        return self._executar(lambda conn: conn.execute('SELECT COUNT(*) FROM cache_calendario').fetchone()[0])
+
+
+class CacheCalendario:
+    """
+    Cache das respostas de GET /api/reunioes/calendario por (ano, mes).
+    Falhas do backend nunca derrubam a requisição: o cache apenas é ignorado.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else BackendMemoria()
+        self.acertos = 0
+        self.faltas = 0
+
+    @staticmethod
+    def chave(ano, mes):
+        return f'{ano:04d}-{mes:02d}'
+
+    def obter(self, ano, mes):
+        """Retorna (corpo, geracao); corpo é None quando não está em cache"""
+        chave = self.chave(ano, mes)
+        try:
+            corpo, geracao = self.backend.ler(chave)
+        except Exception as e:
+            logging.warning(f"Cache do calendário indisponível: {str(e)}")
+            return None, None
+        if corpo is None:
+            self.faltas += 1
+        else:
+            self.acertos += 1
+        return corpo, geracao
+
+    def guardar(self, ano, mes, corpo, geracao):
+        if geracao is None:
+            return
+        try:
+            self.backend.guardar(self.chave(ano, mes), corpo, geracao)
+        except Exception as e:
+            logging.warning(f"Erro ao gravar no cache do calendário: {str(e)}")
+
+    def invalidar_periodos(self, periodos):
+        """Invalida apenas os meses tocados pelos intervalos (inicio, fim)"""
+        chaves = set()
+        for inicio, fim in periodos:
+            chaves.update(self.chave(ano, mes) for ano, mes in meses_do_periodo(inicio, fim))
+        if not chaves:
+            return
+        try:
+            self.backend.invalidar(sorted(chaves))
+        except Exception as e:
+            # Chamado depois do commit: a alteração já foi gravada e não pode virar um 500
+            logging.warning(f"Erro ao invalidar o cache do calendário: {str(e)}")
+
+    def limpar(self):
+        try:
+            self.backend.limpar()
+        except Exception as e:
+            logging.warning(f"Erro ao limpar o cache do calendário: {str(e)}")
+
+    def estatisticas(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'entradas': len(self.backend),
+            'tamanho_maximo': self.backend.tamanho_maximo,
+            'ttl': getattr(self.backend, 'ttl', None),
+            'acertos': self.acertos,
+            'faltas': self.faltas
+        }
+
+
+cache_calendario = CacheCalendario()
+
+
+def arquivo_padrao(app):
+    """Arquivo do cache no diretório temporário, um por banco de dados"""
+    banco = str(app.config.get('SQLALCHEMY_DATABASE_URI', ''))
+    sufixo = hashlib.sha1(banco.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'cache_calendario_{sufixo}.db')
+
+
+def configurar_cache_calendario(app):
+    """
+    Escolhe o backend a partir de CACHE_CALENDARIO_ARQUIVO,
+    CACHE_CALENDARIO_TAMANHO e CACHE_CALENDARIO_TTL. Por padrão usa um
+    arquivo SQLite no diretório temporário, compartilhado pelos workers da
+    máquina; CACHE_CALENDARIO_ARQUIVO=memoria usa o backend do processo.
+    """
+    caminho = app.config.get('CACHE_CALENDARIO_ARQUIVO', os.environ.get('CACHE_CALENDARIO_ARQUIVO'))
+    tamanho = int(app.config.get('CACHE_CALENDARIO_TAMANHO', os.environ.get('CACHE_CALENDARIO_TAMANHO', 120)))
+    ttl = float(app.config.get('CACHE_CALENDARIO_TTL', os.environ.get('CACHE_CALENDARIO_TTL', CACHE_CALENDARIO_TTL)))
+    if caminho == 'memoria':
+        cache_calendario.backend = BackendMemoria(tamanho, ttl)
+        logging.info(f"Cache do calendário: BackendMemoria ({tamanho} meses, {ttl:g} s), "
+                     f"válido apenas para um único processo")
+        return
+    caminho = caminho or arquivo_padrao(app)
+    try:
+        cache_calendario.backend = BackendSQLite(caminho, tamanho)
+    except sqlite3.Error as e:
+        logging.warning(f"Cache do calendário em {caminho} indisponível ({str(e)}); usando memória")
+        cache_calendario.backend = BackendMemoria(tamanho, ttl)
+    logging.info(f"Cache do calendário: {type(cache_calendario.backend).__name__} ({caminho}, {tamanho} meses)")
@@ -0,0 +1,44 @@
+from functools import wraps
+from flask import make_response, request, session
+from src.models.versao import obter_versoes
+from src.utils.compressao import WBITS, sufixo_etag
+import hashlib
+
+
+def etag_por_versao(*tabelas, requer_login=True, chave=None):
+    """
+    Decorator de GET condicional. O ETag é derivado da versão das tabelas
+    das quais a resposta depende (e da URL com os parâmetros), então um
+    If-None-Match válido responde 304 sem executar a consulta nem serializar.
+    `chave`, se informada, é chamada na requisição e o seu resultado entra
+    no ETag; serve para valores que a URL não determina (ex.: o mês atual).
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Sem sessão a própria view responde 401
+            if requer_login and 'user_id' not in session:
+                return view(*args, **kwargs)
+
+            versoes = obter_versoes(tabelas)
+            partes = [request.full_path, ','.join(f'{t}={versoes[t]}' for t in tabelas)]
+            if chave is not None:
+                partes.append(repr(chave()))
+            etag = hashlib.sha1('|'.join(partes).encode()).hexdigest()[:24]
+
+            # A compressão acrescenta um sufixo por codificação ao ETag
+            representacoes = [sufixo_etag(etag, c) for c in ('identity',) + tuple(WBITS)]
+            atendida = next((e for e in representacoes if e in request.if_none_match), None)
+            if atendida:
+                resposta = make_response('', 304)
+                etag = atendida
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+            return resposta
+        return wrapper
+    return decorador
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from threading import Lock
+import os
+import time
+
+
+class CachePrincipal:
+    """
+    Cache do usuário autenticado por id (campos de to_dict_safe e o flag
+    ativo), para que /api/auth/check e /api/auth/me não consultem o banco a
+    cada carregamento de página.
+
+    O cache é local a cada processo: as rotas de user_bp invalidam a entrada
+    no processo que fez a alteração e o TTL limita por quanto tempo os demais
+    workers podem ver um usuário desativado ou editado.
+    """
+
+    def __init__(self, ttl=60, tamanho_maximo=10000):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._lock = Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, user_id):
+        """Retorna (dados, ativo) ou None se ausente ou expirado"""
+        with self._lock:
+            item = self._itens.get(user_id)
+            if item is None or item[0] < time.monotonic():
+                self._itens.pop(user_id, None)
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(user_id)
+            self.acertos += 1
+            return item[1], item[2]
+
+    def guardar(self, user_id, dados, ativo):
+        with self._lock:
+            self._itens[user_id] = (time.monotonic() + self.ttl, dados, ativo)
+            self._itens.move_to_end(user_id)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, user_id):
+        with self._lock:
+            self._itens.pop(user_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        return {
+            'entradas': len(self._itens),
+            'ttl': self.ttl,
+            'acertos': self.acertos,
+            'faltas': self.faltas
+        }
+
+
+cache_principal = CachePrincipal(ttl=int(os.environ.get('CACHE_PRINCIPAL_TTL', 60)))
@@ -0,0 +1,139 @@
+from flask import request
+from threading import Lock
+import logging
+import os
+import zlib
+
+# Tipos que valem a pena comprimir (SSE fica de fora: precisa chegar na hora)
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript',
+                      'application/javascript')
+
+# wbits do zlib para cada Content-Encoding ('deflate' no HTTP é o formato zlib)
+WBITS = {'gzip': 31, 'deflate': 15}
+
+# Em respostas em streaming, força a saída do compressor a cada tantos bytes de entrada
+INTERVALO_FLUSH_STREAM = 64 * 1024
+
+
+def sufixo_etag(etag, codificacao):
+    """ETag de uma representação comprimida; cada codificação tem o seu"""
+    return etag if codificacao == 'identity' else f'{etag}-{codificacao}'
+
+
+def codificacao_aceita():
+    """Codificação a usar conforme o Accept-Encoding da requisição"""
+    aceitas = request.accept_encodings
+    melhor = max(WBITS, key=lambda c: aceitas[c])
+    return melhor if aceitas[melhor] else 'identity'
+
+
+class Compressao:
+    """
+    Compressão negociada (gzip/deflate) das respostas, aplicada em
+    after_request. Respostas menores que `minimo` bytes não são comprimidas;
+    respostas em streaming são comprimidas à medida que são geradas.
+    Mantém, por endpoint, os bytes antes e depois da compressão.
+    """
+
+    def __init__(self, minimo=1024, nivel=6):
+        self.minimo = minimo
+        self.nivel = nivel
+        self._estatisticas = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.minimo = int(app.config.get('COMPRESSAO_MINIMO', os.environ.get('COMPRESSAO_MINIMO', self.minimo)))
+        self.nivel = int(app.config.get('COMPRESSAO_NIVEL', os.environ.get('COMPRESSAO_NIVEL', self.nivel)))
+        app.after_request(self.comprimir)
+        logging.info(f"Compressão de respostas: mínimo {self.minimo} bytes, nível {self.nivel}")
+
+    def _registrar(self, endpoint, original, enviado):
+        with self._lock:
+            item = self._estatisticas.setdefault(endpoint, {
+                'respostas': 0, 'comprimidas': 0, 'bytes_originais': 0, 'bytes_enviados': 0
+            })
+            item['respostas'] += 1
+            item['bytes_originais'] += original
+            item['bytes_enviados'] += enviado
+            if enviado != original:
+                item['comprimidas'] += 1
+
+    def comprimir(self, response):
+        endpoint = request.endpoint or 'desconhecido'
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in TIPOS_COMPRIMIVEIS
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        codificacao = codificacao_aceita()
+
+        if response.is_streamed:
+            if codificacao != 'identity':
+                response.response = self._comprimir_stream(response.response, codificacao, endpoint)
+                response.headers.pop('Content-Length', None)
+                self._marcar(response, codificacao)
+            return response
+
+        corpo = response.get_data()
+        if codificacao == 'identity' or len(corpo) < self.minimo:
+            self._registrar(endpoint, len(corpo), len(corpo))
+            return response
+
+        compressor = zlib.compressobj(self.nivel, zlib.DEFLATED, WBITS[codificacao])
+        comprimido = compressor.compress(corpo) + compressor.flush()
+        response.set_data(comprimido)
+        self._marcar(response, codificacao)
+        self._registrar(endpoint, len(corpo), len(comprimido))
+        return response
+
+    @staticmethod
+    def _marcar(response, codificacao):
+        response.headers['Content-Encoding'] = codificacao
+        etag, fraco = response.get_etag()
+        if etag:
+            response.set_etag(sufixo_etag(etag, codificacao), weak=fraco)
+
+    def _comprimir_stream(self, partes, codificacao, endpoint):
+        compressor = zlib.compressobj(self.nivel, zlib.DEFLATED, WBITS[codificacao])
+        original = enviado = pendente = 0
+        try:
+            for parte in partes:
+                if isinstance(parte, str):
+                    parte = parte.encode('utf-8')
+                original += len(parte)
+                pendente += len(parte)
+                saida = compressor.compress(parte)
+                if pendente >= INTERVALO_FLUSH_STREAM:
+                    # Entrega o que já foi gerado sem esperar o fim da resposta
+                    saida += compressor.flush(zlib.Z_SYNC_FLUSH)
+                    pendente = 0
+                if saida:
+                    enviado += len(saida)
+                    yield saida
+            saida = compressor.flush()
+            enviado += len(saida)
+            yield saida
+        finally:
+            if hasattr(partes, 'close'):
+                partes.close()
+            self._registrar(endpoint, original, enviado)
+
+    def estatisticas(self):
+        with self._lock:
+            resultado = {}
+            for endpoint, item in self._estatisticas.items():
+                economia = item['bytes_originais'] - item['bytes_enviados']
+                resultado[endpoint] = dict(item, bytes_economizados=economia, taxa=round(
+                    item['bytes_enviados'] / item['bytes_originais'], 3) if item['bytes_originais'] else None)
+            return {'minimo': self.minimo, 'nivel': self.nivel, 'endpoints': resultado}
+
+
+compressao = Compressao()
+
+
+def configurar_compressao(app):
+    """Lê COMPRESSAO_MINIMO e COMPRESSAO_NIVEL e registra o after_request"""
+    compressao.init_app(app)
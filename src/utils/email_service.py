@@ -1,244 +1,526 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from email.utils import formataddr, parseaddr
+from collections import deque
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from threading import Event, Lock, Thread
+from src.models.email_saida import EmailSaida
+from src.models.user import db
+import atexit
 import logging
+import os
+import queue
+import time
+import uuid
 
 # Configurações de email
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USER = 'agendamontereletrica@gmail.com'
-EMAIL_PASSWORD = 'cent dvbi wgxc acjd'  # App password fornecida pelo usuário
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_USER = os.environ.get('EMAIL_USER', 'agendamontereletrica@gmail.com')
+EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD', 'cent dvbi wgxc acjd')  # App password fornecida pelo usuário
+EMAIL_TLS = os.environ.get('EMAIL_TLS', '1') not in ('0', 'false', 'False')
+
+# Mensagens enviadas por conexão antes de reconectar
+EMAIL_MAX_POR_CONEXAO = int(os.environ.get('EMAIL_MAX_POR_CONEXAO', 100))
+
+# Conexões ociosas por mais tempo que isso são fechadas (o Gmail derruba em ~5 min)
+EMAIL_OCIOSO_MAXIMO = 60
+
+# Templates dos emails, compilados uma única vez na importação; o HTML é
+# escapado automaticamente (títulos e descrições vêm do usuário)
+_ambiente_templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'email')),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False
+)
+TEMPLATES = {
+    nome: _ambiente_templates.get_template(nome)
+    for nome in ('agendamento.html', 'agendamento.txt', 'cancelamento.html', 'cancelamento.txt')
+}
+
+
+class ConexaoSMTP:
+    """
+    Sessão SMTP autenticada reaproveitada entre envios. A conexão é aberta
+    sob demanda, renovada após `max_mensagens` envios ou quando fica ociosa,
+    e reaberta uma vez se o servidor a derrubar no meio do envio.
+    Não é thread-safe: cada thread de envio usa a sua.
+    """
+
+    def __init__(self, host=None, port=None, usuario=None, senha=None, tls=None,
+                 max_mensagens=None, ocioso_maximo=EMAIL_OCIOSO_MAXIMO, timeout=30):
+        self.host = host or EMAIL_HOST
+        self.port = port or EMAIL_PORT
+        self.usuario = EMAIL_USER if usuario is None else usuario
+        self.senha = EMAIL_PASSWORD if senha is None else senha
+        self.tls = EMAIL_TLS if tls is None else tls
+        self.max_mensagens = max_mensagens or EMAIL_MAX_POR_CONEXAO
+        self.ocioso_maximo = ocioso_maximo
+        self.timeout = timeout
+        self._servidor = None
+        self._mensagens = 0
+        self._ultimo_uso = 0
+        self.conexoes = 0
+
+    def _conectar(self):
+        servidor = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.tls:
+                servidor.starttls()
+            if self.senha:
+                servidor.login(self.usuario, self.senha)
+        except Exception:
+            servidor.close()
+            raise
+        self._servidor = servidor
+        self._mensagens = 0
+        self.conexoes += 1
+
+    def fechar(self):
+        servidor, self._servidor = self._servidor, None
+        if servidor is None:
+            return
+        try:
+            servidor.quit()
+        except Exception:
+            servidor.close()
+
+    def enviar(self, remetente, destinatario, mensagem):
+        """Envia uma mensagem já serializada, reconectando se necessário"""
+        if self._servidor is not None and (
+                self._mensagens >= self.max_mensagens
+                or time.monotonic() - self._ultimo_uso > self.ocioso_maximo):
+            self.fechar()
+
+        for tentativa in range(2):
+            if self._servidor is None:
+                self._conectar()
+            try:
+                self._servidor.sendmail(remetente, destinatario, mensagem)
+                break
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                # Só tenta de novo quando a conexão caiu (421 = servidor encerrando)
+                queda = not isinstance(e, smtplib.SMTPResponseException) or e.smtp_code == 421
+                self.fechar()
+                if tentativa or not queda:
+                    raise
+        self._mensagens += 1
+        self._ultimo_uso = time.monotonic()
+
+
+def montar_mensagem(assunto, corpo_html, corpo_texto=None):
+    """
+    Serializa a mensagem MIME uma única vez, sem o cabeçalho To, já em bytes
+    com CRLF. Cada destinatário recebe os mesmos bytes (ver `para`).
+    """
+    msg = MIMEMultipart('alternative')
+    msg['From'] = EMAIL_USER
+    msg['Subject'] = assunto
+    
+    # Adicionar corpo do email
+    if corpo_texto:
+        part1 = MIMEText(corpo_texto, 'plain', 'utf-8')
+        msg.attach(part1)
+    
+    part2 = MIMEText(corpo_html, 'html', 'utf-8')
+    msg.attach(part2)
+    
+    return msg.as_bytes(policy=msg.policy.clone(linesep='\r\n'))
+
+def para(mensagem, destinatario):
+    """
+    Mensagem serializada com o cabeçalho To do destinatário. Nomes não ASCII
+    são codificados (RFC 2047) e quebras de linha, que injetariam
+    cabeçalhos, são recusadas com ValueError.
+    """
+    if '\r' in destinatario or '\n' in destinatario:
+        raise ValueError(f'Destinatário inválido: {destinatario!r}')
+    nome, endereco = parseaddr(destinatario)
+    if '@' not in endereco:
+        raise ValueError(f'Destinatário inválido: {destinatario!r}')
+    return f'To: {formataddr((nome, endereco), charset="utf-8")}\r\n'.encode('utf-8') + mensagem
+
+def enviar_lote(destinatarios, assunto, corpo_html, corpo_texto=None, conexao=None):
+    """
+    Envia o mesmo email a vários destinatários pela mesma conexão SMTP.
+    Retorna {destinatario: erro} dos que falharam; falhas individuais não
+    interrompem o lote.
+    """
+    mensagem = montar_mensagem(assunto, corpo_html, corpo_texto)
+    propria = conexao is None
+    conexao = conexao or ConexaoSMTP()
+    falhas = {}
+    try:
+        for destinatario in destinatarios:
+            try:
+                conexao.enviar(EMAIL_USER, destinatario, para(mensagem, destinatario))
+                logging.info(f"Email enviado com sucesso para {destinatario}")
+            except Exception as e:
+                falhas[destinatario] = str(e)
+                logging.error(f"Erro ao enviar email para {destinatario}: {str(e)}")
+    finally:
+        if propria:
+            conexao.fechar()
+    return falhas
 
 def enviar_email(destinatario, assunto, corpo_html, corpo_texto=None):
     """
     Envia um email para o destinatário especificado
     """
-    try:
-        # Criar mensagem
-        msg = MIMEMultipart('alternative')
-        msg['From'] = EMAIL_USER
-        msg['To'] = destinatario
-        msg['Subject'] = assunto
-        
-        # Adicionar corpo do email
-        if corpo_texto:
-            part1 = MIMEText(corpo_texto, 'plain', 'utf-8')
-            msg.attach(part1)
-        
-        part2 = MIMEText(corpo_html, 'html', 'utf-8')
-        msg.attach(part2)
-        
-        # Conectar ao servidor SMTP
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
+    return not enviar_lote([destinatario], assunto, corpo_html, corpo_texto)
+
+class DespachoEmails:
+    """
+    Envio em segundo plano dos emails gravados na caixa de saída (EmailSaida).
+
+    Uma thread coordenadora reivindica lotes de linhas prontas para envio e
+    os repassa, por uma fila limitada, a um pool de threads de envio, cada
+    uma com sua própria conexão SMTP reaproveitada. Falhas voltam para a
+    caixa de saída com espera exponencial até `max_tentativas`, quando a
+    linha vai para o estado 'falha'. Linhas reivindicadas por um processo
+    que morreu são retomadas quando a reserva expira (entrega ao menos uma vez).
+
+    O coordenador só reivindica o que cabe na fila, e a thread de envio
+    renova a reserva ao pegar a linha; se ela já expirou e outro processo a
+    reivindicou, a linha é descartada em vez de enviada duas vezes.
+
+    As threads são iniciadas na primeira requisição de cada processo, pois
+    não sobrevivem ao fork dos workers do gunicorn.
+    """
+
+    def __init__(self, workers=4, tamanho_lote=50, intervalo_consulta=5.0, max_tentativas=6,
+                 espera_base=30, espera_maxima=3600, reserva=300, enviar=None, criar_conexao=None):
+        self.workers = workers
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_consulta = intervalo_consulta
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.reserva = reserva
+        self._enviar = enviar or enviar_lote
+        self._criar_conexao = criar_conexao or ConexaoSMTP
+        self._app = None
+        self._fila = queue.Queue(maxsize=workers * 2)
+        self._acordar = Event()
+        self._threads = []
+        self._conexoes = []
+        self._pid = None
+        self._lock = Lock()
+        self._encerrando = False
+        self.reivindicados = 0
+        self.enviados = 0
+        self.falhas = 0
+        self.desistidos = 0
+        self._latencias_envio = deque(maxlen=200)
+        self._latencias_fila = deque(maxlen=200)
+
+    def configurar(self, app):
+        self._app = app
+
+    def garantir(self):
+        """Inicia as threads deste processo, se ainda não estiverem rodando"""
+        if self._app is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._pid = os.getpid()
+            self._fila = queue.Queue(maxsize=self.workers * 2)
+            self._encerrando = False
+            self._conexoes = [self._criar_conexao() for _ in range(self.workers)]
+            self._threads = [Thread(target=self._coordenar, name='email-coordenador', daemon=True)]
+            self._threads += [
+                Thread(target=self._trabalhar, args=(conexao,), name=f'email-{i}', daemon=True)
+                for i, conexao in enumerate(self._conexoes)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def acordar(self):
+        """Chamado após o commit de novos emails para enviá-los sem esperar a consulta periódica"""
+        self.garantir()
+        self._acordar.set()
+
+    def _reivindicar(self, limite):
+        """Marca até `limite` linhas prontas como 'enviando' e as retorna"""
+        agora = datetime.utcnow()
+        prontas = db.and_(
+            EmailSaida.estado.in_(('pendente', 'enviando')),
+            EmailSaida.proxima_tentativa <= agora
+        )
+        ids = [linha[0] for linha in db.session.query(EmailSaida.id).filter(prontas)
+               .order_by(EmailSaida.proxima_tentativa).limit(limite)]
+        if not ids:
+            return []
         
-        # Enviar email
-        text = msg.as_string()
-        server.sendmail(EMAIL_USER, destinatario, text)
-        server.quit()
+        # O UPDATE condicional garante que cada linha fica com um único processo
+        token = uuid.uuid4().hex
+        db.session.execute(
+            db.update(EmailSaida)
+            .where(EmailSaida.id.in_(ids), prontas)
+            .values(estado='enviando', lote=token, proxima_tentativa=agora + timedelta(seconds=self.reserva))
+        )
+        db.session.commit()
         
-        logging.info(f"Email enviado com sucesso para {destinatario}")
-        return True
+        linhas = db.session.query(
+            EmailSaida.id, EmailSaida.destinatarios, EmailSaida.assunto,
+            EmailSaida.corpo_html, EmailSaida.corpo_texto, EmailSaida.tentativas
+        ).filter(EmailSaida.lote == token).all()
+        db.session.commit()
+        return [(time.monotonic(), token) + tuple(linha) for linha in linhas]
+
+    def _renovar_reserva(self, email_id, token):
+        """Renova a reserva ao iniciar o envio; False se a linha já não é deste lote"""
+        resultado = db.session.execute(
+            db.update(EmailSaida)
+            .where(EmailSaida.id == email_id, EmailSaida.lote == token)
+            .values(proxima_tentativa=datetime.utcnow() + timedelta(seconds=self.reserva))
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    def _coordenar(self):
+        while not self._encerrando:
+            # Reivindicar só o que as threads de envio podem pegar agora, para
+            # que as linhas não fiquem paradas na fila com a reserva correndo
+            vagas = self._fila.maxsize - self._fila.qsize()
+            lote = []
+            if vagas > 0:
+                try:
+                    with self._app.app_context():
+                        lote = self._reivindicar(min(vagas, self.tamanho_lote))
+                except Exception as e:
+                    logging.error(f"Erro ao buscar emails na caixa de saída: {str(e)}")
+            
+            self.reivindicados += len(lote)
+            for item in lote:
+                self._fila.put(item)
+            
+            if vagas <= 0:
+                # Fila cheia: esperar as threads de envio liberarem espaço
+                self._acordar.wait(0.5)
+                self._acordar.clear()
+            elif len(lote) < min(vagas, self.tamanho_lote):
+                self._acordar.wait(self.intervalo_consulta)
+                self._acordar.clear()
+
+    def _trabalhar(self, conexao):
+        fila = self._fila
+        while True:
+            try:
+                item = fila.get(timeout=conexao.ocioso_maximo)
+            except queue.Empty:
+                # Sem emails por um tempo: libera a conexão em vez de deixá-la expirar
+                conexao.fechar()
+                continue
+            try:
+                if item is None:
+                    conexao.fechar()
+                    return
+                reivindicado_em, token, email_id, destinatarios, assunto, corpo_html, corpo_texto, tentativas = item
+                with self._app.app_context():
+                    if not self._renovar_reserva(email_id, token):
+                        logging.warning(f"Reserva do email {email_id} expirou na fila; já retomado por outro envio")
+                        continue
+                inicio = time.monotonic()
+                try:
+                    falhas = self._enviar(destinatarios, assunto, corpo_html, corpo_texto, conexao=conexao)
+                except Exception as e:
+                    falhas = dict.fromkeys(destinatarios, str(e))
+                fim = time.monotonic()
+                self._latencias_fila.append(inicio - reivindicado_em)
+                self._latencias_envio.append((fim - inicio) / max(1, len(destinatarios)))
+                self.enviados += len(destinatarios) - len(falhas)
+                self.falhas += len(falhas)
+                with self._app.app_context():
+                    self._registrar_resultado(email_id, token, tentativas, falhas)
+            except Exception as e:
+                logging.error(f"Erro no envio de email em segundo plano: {str(e)}")
+            finally:
+                fila.task_done()
+
+    def _registrar_resultado(self, email_id, token, tentativas, falhas):
+        agora = datetime.utcnow()
+        if not falhas:
+            valores = {'estado': 'enviado', 'enviado_em': agora, 'lote': None, 'ultimo_erro': None}
+        else:
+            tentativas += 1
+            # Só os destinatários que falharam são tentados de novo
+            valores = {
+                'destinatarios': list(falhas),
+                'tentativas': tentativas,
+                'lote': None,
+                'ultimo_erro': '; '.join(f'{d}: {erro}' for d, erro in falhas.items())[:2000]
+            }
+            if tentativas >= self.max_tentativas:
+                valores['estado'] = 'falha'
+                self.desistidos += 1
+                logging.error(f"Email {email_id} desistido após {tentativas} tentativas")
+            else:
+                espera = min(self.espera_maxima, self.espera_base * 2 ** (tentativas - 1))
+                valores['estado'] = 'pendente'
+                valores['proxima_tentativa'] = agora + timedelta(seconds=espera)
         
-    except Exception as e:
-        logging.error(f"Erro ao enviar email para {destinatario}: {str(e)}")
-        return False
+        # Se a reserva expirou e outro processo reivindicou a linha, ele decide
+        db.session.execute(
+            db.update(EmailSaida)
+            .where(EmailSaida.id == email_id, EmailSaida.lote == token)
+            .values(**valores)
+        )
+        db.session.commit()
+
+    def encerrar(self, timeout=10):
+        """Para de buscar novos emails, termina os envios em curso e finaliza as threads"""
+        with self._lock:
+            if self._pid != os.getpid() or not self._threads:
+                return
+            self._encerrando = True
+            threads, self._threads = self._threads, []
+        self._acordar.set()
+        limite = time.monotonic() + timeout
+        threads[0].join(max(0, limite - time.monotonic()))
+        for _ in threads[1:]:
+            try:
+                self._fila.put(None, timeout=max(0, limite - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads[1:]:
+            thread.join(max(0, limite - time.monotonic()))
+        # O que ficou reivindicado e não enviado volta ao expirar a reserva
+
+    @staticmethod
+    def _resumo(latencias):
+        valores = sorted(latencias)
+        if not valores:
+            return {'media': None, 'p95': None, 'maxima': None}
+        return {
+            'media': round(sum(valores) / len(valores), 3),
+            'p95': round(valores[min(len(valores) - 1, int(len(valores) * 0.95))], 3),
+            'maxima': round(valores[-1], 3)
+        }
+
+    def estatisticas(self):
+        ativo = self._pid == os.getpid()
+        return {
+            'workers': len(self._threads) - 1 if ativo and self._threads else 0,
+            'fila': self._fila.qsize(),
+            'reivindicados': self.reivindicados,
+            'enviados': self.enviados,
+            'falhas': self.falhas,
+            'desistidos': self.desistidos,
+            'conexoes_smtp': sum(getattr(c, 'conexoes', 0) for c in self._conexoes) if ativo else 0,
+            'latencia_envio_s': self._resumo(self._latencias_envio),
+            'espera_fila_s': self._resumo(self._latencias_fila)
+        }
+
+
+despacho_emails = DespachoEmails(
+    workers=int(os.environ.get('EMAIL_WORKERS', 4)),
+    max_tentativas=int(os.environ.get('EMAIL_MAX_TENTATIVAS', 6))
+)
+atexit.register(despacho_emails.encerrar)
+
+
+def configurar_despacho_emails(app):
+    """Liga o despacho ao app; as threads sobem na primeira requisição de cada processo"""
+    despacho_emails.configurar(app)
+    app.before_request(despacho_emails.garantir)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_emails_novos(session, flush_context):
+    if any(isinstance(obj, EmailSaida) for obj in session.new):
+        session.info['emails_novos'] = True
+
 
-def enviar_notificacao_agendamento(reuniao, participantes):
+@event.listens_for(Session, 'after_commit')
+def _acordar_despacho(session):
+    if session.info.pop('emails_novos', False):
+        despacho_emails.acordar()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_emails_novos(session):
+    session.info.pop('emails_novos', None)
+
+
+def agendar_email(destinatarios, assunto, corpo_html, corpo_texto=None):
     """
-    Envia notificação de agendamento de reunião para todos os participantes
+    Grava o email na caixa de saída, na sessão atual, sem fazer commit.
+    Retorna quantos destinatários foram agendados.
     """
-    data_inicio = reuniao.data_inicio.strftime('%d/%m/%Y às %H:%M')
-    data_fim = reuniao.data_fim.strftime('%d/%m/%Y às %H:%M')
-    
-    assunto = f"Nova Reunião Agendada: {reuniao.titulo}"
-    
-    # Template HTML do email
-    corpo_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }}
-            .info-box {{ background: white; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #667eea; }}
-            .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>📅 Nova Reunião Agendada</h1>
-            </div>
-            <div class="content">
-                <p>Olá!</p>
-                
-                <p>Uma nova reunião foi agendada e você foi convidado(a) para participar.</p>
-                
-                <div class="info-box">
-                    <h3>📋 Detalhes da Reunião</h3>
-                    <p><strong>Título:</strong> {reuniao.titulo}</p>
-                    <p><strong>Descrição:</strong> {reuniao.descricao or 'Sem descrição'}</p>
-                    <p><strong>Data e Hora de Início:</strong> {data_inicio}</p>
-                    <p><strong>Data e Hora de Término:</strong> {data_fim}</p>
-                    <p><strong>Local:</strong> {reuniao.sala_reuniao.nome}</p>
-                    <p><strong>Organizador:</strong> {reuniao.criador.username}</p>
-                </div>
-                
-                <div class="info-box">
-                    <h3>👥 Participantes Convidados</h3>
-                    <ul>
-                        {''.join([f'<li>{p.username} ({p.email})</li>' for p in participantes])}
-                    </ul>
-                </div>
-                
-                <p>Por favor, confirme sua presença e anote em sua agenda.</p>
-                
-                <p>Atenciosamente,<br>
-                <strong>Sistema de Agendamento de Reuniões</strong></p>
-            </div>
-            <div class="footer">
-                <p>Este é um email automático. Não responda a esta mensagem.</p>
-            </div>
-        </div>
-    </body>
-    </html>
+    destinatarios = list(destinatarios)
+    if destinatarios:
+        db.session.add(EmailSaida(
+            destinatarios=destinatarios,
+            assunto=assunto,
+            corpo_html=corpo_html,
+            corpo_texto=corpo_texto
+        ))
+    return len(destinatarios)
+
+def _contexto_notificacao(reuniao, participantes):
+    return {
+        'titulo': reuniao.titulo,
+        'descricao': reuniao.descricao,
+        'data_inicio': reuniao.data_inicio.strftime('%d/%m/%Y às %H:%M'),
+        'data_fim': reuniao.data_fim.strftime('%d/%m/%Y às %H:%M'),
+        'local': reuniao.sala_reuniao.nome,
+        'organizador': reuniao.criador.username,
+        'participantes': participantes
+    }
+
+DIAS_SEMANA = ('segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo')
+UNIDADES_FREQUENCIA = {'diaria': ('dia', 'dias'), 'semanal': ('semana', 'semanas'), 'mensal': ('mês', 'meses')}
+
+def _descrever_regra(regra):
+    """Ex.: 'A cada 2 semanas (segunda, quarta), 10 ocorrências'"""
+    singular, plural = UNIDADES_FREQUENCIA[regra.frequencia]
+    texto = f"A cada {singular}" if regra.intervalo == 1 else f"A cada {regra.intervalo} {plural}"
+    if regra.dias_semana:
+        texto += f" ({', '.join(DIAS_SEMANA[d] for d in sorted(set(regra.dias_semana)))})"
+    if regra.contagem:
+        texto += f", {regra.contagem} ocorrência{'s' if regra.contagem > 1 else ''}"
+    if regra.ate:
+        texto += f", até {regra.ate.strftime('%d/%m/%Y')}"
+    return texto
+
+def _contexto_serie(regra, reunioes, ignoradas):
+    return {
+        'regra': _descrever_regra(regra),
+        'datas': [f"{r.data_inicio.strftime('%d/%m/%Y às %H:%M')} - {r.data_fim.strftime('%H:%M')}" for r in reunioes],
+        'ignoradas': [inicio.strftime('%d/%m/%Y às %H:%M') for inicio in ignoradas]
+    }
+
+def enviar_notificacao_agendamento(reuniao, participantes, serie=None, reunioes_serie=None, ignoradas=()):
     """
-    
-    # Corpo em texto simples
-    corpo_texto = f"""
-    Olá!
-    
-    Uma nova reunião foi agendada e você foi convidado(a) para participar.
-    
-    DETALHES DA REUNIÃO:
-    - Título: {reuniao.titulo}
-    - Descrição: {reuniao.descricao or 'Sem descrição'}
-    - Data e Hora de Início: {data_inicio}
-    - Data e Hora de Término: {data_fim}
-    - Local: {reuniao.sala_reuniao.nome}
-    - Organizador: {reuniao.criador.username}
-    
-    PARTICIPANTES CONVIDADOS:
-    {chr(10).join([f'- {p.username} ({p.email})' for p in participantes])}
-    
-    Por favor, confirme sua presença e anote em sua agenda.
-    
-    Atenciosamente,
-    Sistema de Agendamento de Reuniões
-    
-    ---
-    Este é um email automático. Não responda a esta mensagem.
+    Agenda a notificação de agendamento de reunião para todos os participantes.
+    Para uma série, `reuniao` é a primeira ocorrência e a mensagem lista a
+    regra, as ocorrências criadas e as ignoradas por conflito.
     """
+    contexto = _contexto_notificacao(reuniao, participantes)
+    if serie is not None:
+        contexto['serie'] = _contexto_serie(serie, reunioes_serie or [reuniao], ignoradas)
+        assunto = f"Nova Série de Reuniões Agendada: {reuniao.titulo}"
+    else:
+        assunto = f"Nova Reunião Agendada: {reuniao.titulo}"
+    corpo_html = TEMPLATES['agendamento.html'].render(contexto)
+    corpo_texto = TEMPLATES['agendamento.txt'].render(contexto)
     
-    # Enviar para todos os participantes
-    emails_enviados = 0
-    for participante in participantes:
-        if enviar_email(participante.email, assunto, corpo_html, corpo_texto):
-            emails_enviados += 1
-    
-    return emails_enviados
+    # Gravado na caixa de saída, na transação de quem chamou; o envio ocorre após o commit
+    return agendar_email([p.email for p in participantes], assunto, corpo_html, corpo_texto)
 
 def enviar_notificacao_cancelamento(reuniao, participantes):
     """
-    Envia notificação de cancelamento de reunião para todos os participantes
+    Agenda a notificação de cancelamento de reunião para todos os participantes
     """
-    data_inicio = reuniao.data_inicio.strftime('%d/%m/%Y às %H:%M')
-    data_fim = reuniao.data_fim.strftime('%d/%m/%Y às %H:%M')
-    
+    contexto = _contexto_notificacao(reuniao, participantes)
     assunto = f"Reunião Cancelada: {reuniao.titulo}"
+    corpo_html = TEMPLATES['cancelamento.html'].render(contexto)
+    corpo_texto = TEMPLATES['cancelamento.txt'].render(contexto)
     
-    # Template HTML do email
-    corpo_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #dc3545 0%, #c82333 100%); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }}
-            .info-box {{ background: white; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #dc3545; }}
-            .footer {{ text-align: center; margin-top: 20px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>❌ Reunião Cancelada</h1>
-            </div>
-            <div class="content">
-                <p>Olá!</p>
-                
-                <p>Informamos que a reunião abaixo foi <strong>cancelada</strong>.</p>
-                
-                <div class="info-box">
-                    <h3>📋 Detalhes da Reunião Cancelada</h3>
-                    <p><strong>Título:</strong> {reuniao.titulo}</p>
-                    <p><strong>Descrição:</strong> {reuniao.descricao or 'Sem descrição'}</p>
-                    <p><strong>Data e Hora de Início:</strong> {data_inicio}</p>
-                    <p><strong>Data e Hora de Término:</strong> {data_fim}</p>
-                    <p><strong>Local:</strong> {reuniao.sala_reuniao.nome}</p>
-                    <p><strong>Organizador:</strong> {reuniao.criador.username}</p>
-                </div>
-                
-                <div class="info-box">
-                    <h3>👥 Participantes que Foram Notificados</h3>
-                    <ul>
-                        {''.join([f'<li>{p.username} ({p.email})</li>' for p in participantes])}
-                    </ul>
-                </div>
-                
-                <p>Por favor, remova este compromisso de sua agenda.</p>
-                
-                <p>Atenciosamente,<br>
-                <strong>Sistema de Agendamento de Reuniões</strong></p>
-            </div>
-            <div class="footer">
-                <p>Este é um email automático. Não responda a esta mensagem.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Corpo em texto simples
-    corpo_texto = f"""
-    Olá!
-    
-    Informamos que a reunião abaixo foi CANCELADA.
-    
-    DETALHES DA REUNIÃO CANCELADA:
-    - Título: {reuniao.titulo}
-    - Descrição: {reuniao.descricao or 'Sem descrição'}
-    - Data e Hora de Início: {data_inicio}
-    - Data e Hora de Término: {data_fim}
-    - Local: {reuniao.sala_reuniao.nome}
-    - Organizador: {reuniao.criador.username}
-    
-    PARTICIPANTES QUE FORAM NOTIFICADOS:
-    {chr(10).join([f'- {p.username} ({p.email})' for p in participantes])}
-    
-    Por favor, remova este compromisso de sua agenda.
-    
-    Atenciosamente,
-    Sistema de Agendamento de Reuniões
-    
-    ---
-    Este é um email automático. Não responda a esta mensagem.
-    """
-    
-    # Enviar para todos os participantes
-    emails_enviados = 0
-    for participante in participantes:
-        if enviar_email(participante.email, assunto, corpo_html, corpo_texto):
-            emails_enviados += 1
-    
-    return emails_enviados
-
+    return agendar_email([p.email for p in participantes], assunto, corpo_html, corpo_texto)
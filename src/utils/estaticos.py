@@ -0,0 +1,122 @@
+from collections import namedtuple
+from flask import Response, request
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote, apenas gzip
+    brotli = None
+
+# Arquivos com hash no nome nunca mudam de conteúdo
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+# Demais arquivos (index.html e nomes originais) são revalidados pelo ETag
+CACHE_REVALIDAR = 'no-cache'
+
+# Variante comprimida só é guardada se economizar pelo menos isso
+ECONOMIA_MINIMA = 0.9
+
+# Arquivo carregado em memória: corpo original e variantes por Content-Encoding
+Arquivo = namedtuple('Arquivo', 'mimetype etag variantes imutavel')
+
+
+def _variantes(conteudo):
+    variantes = {'identity': conteudo}
+    comprimido = gzip.compress(conteudo, compresslevel=9, mtime=0)
+    if len(comprimido) < len(conteudo) * ECONOMIA_MINIMA:
+        variantes['gzip'] = comprimido
+    if brotli is not None:
+        comprimido = brotli.compress(conteudo, quality=11)
+        if len(comprimido) < len(conteudo) * ECONOMIA_MINIMA:
+            variantes['br'] = comprimido
+    return variantes
+
+
+class ManifestoEstaticos:
+    """
+    Arquivos estáticos carregados uma vez na inicialização: cada arquivo
+    recebe um nome com o hash do conteúdo (script.js -> script.<hash>.js),
+    servido com cache imutável, e variantes pré-comprimidas em gzip (e
+    brotli, se instalado). O index.html é reescrito para apontar para os
+    nomes com hash e é o único revalidado a cada acesso, pelo ETag.
+    """
+
+    def __init__(self, pasta, pagina_inicial='index.html'):
+        self.pasta = pasta
+        self.pagina_inicial = pagina_inicial
+        self.arquivos = {}
+        self.nomes_hash = {}
+        if pasta and os.path.isdir(pasta):
+            self._carregar()
+
+    def _carregar(self):
+        conteudos = {}
+        for raiz, _, nomes in os.walk(self.pasta):
+            for nome in nomes:
+                caminho = os.path.join(raiz, nome)
+                relativo = os.path.relpath(caminho, self.pasta).replace(os.sep, '/')
+                with open(caminho, 'rb') as arquivo:
+                    conteudos[relativo] = arquivo.read()
+
+        for relativo, conteudo in conteudos.items():
+            if relativo == self.pagina_inicial:
+                continue
+            digest = hashlib.sha256(conteudo).hexdigest()[:12]
+            base, extensao = os.path.splitext(relativo)
+            self.nomes_hash[relativo] = f'{base}.{digest}{extensao}'
+            self._adicionar(relativo, conteudo, digest, imutavel=False)
+            self._adicionar(self.nomes_hash[relativo], conteudo, digest, imutavel=True)
+
+        if self.pagina_inicial in conteudos:
+            conteudo = self._reescrever_referencias(conteudos[self.pagina_inicial])
+            self._adicionar(self.pagina_inicial, conteudo, hashlib.sha256(conteudo).hexdigest()[:12], imutavel=False)
+
+        tamanho = sum(len(v) for a in self.arquivos.values() for v in a.variantes.values())
+        logging.info(f"Estáticos: {len(conteudos)} arquivo(s), {tamanho} bytes em memória"
+                     f"{'' if brotli else ' (brotli indisponível)'}")
+
+    def _reescrever_referencias(self, conteudo):
+        """Troca src/href relativos pelos nomes com hash"""
+        def trocar(match):
+            nome = self.nomes_hash.get(match.group(2))
+            return f'{match.group(1)}="{nome}"' if nome else match.group(0)
+        texto = re.sub(r'\b(src|href)="([^":#?]+)"', trocar, conteudo.decode('utf-8'))
+        return texto.encode('utf-8')
+
+    def _adicionar(self, caminho, conteudo, digest, imutavel):
+        mimetype = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+        self.arquivos[caminho] = Arquivo(mimetype, digest, _variantes(conteudo), imutavel)
+
+    def _escolher_codificacao(self, arquivo):
+        aceitas = request.accept_encodings
+        for codificacao in ('br', 'gzip'):
+            if codificacao in arquivo.variantes and aceitas[codificacao]:
+                return codificacao
+        return 'identity'
+
+    def servir(self, caminho):
+        """Resposta para um caminho; desconhecidos recebem o index.html (SPA)"""
+        arquivo = self.arquivos.get(caminho) or self.arquivos.get(self.pagina_inicial)
+        if arquivo is None:
+            return Response(f'{self.pagina_inicial} not found', 404)
+
+        codificacao = self._escolher_codificacao(arquivo)
+        # Cada codificação é uma representação diferente e precisa de ETag próprio
+        etag = arquivo.etag if codificacao == 'identity' else f'{arquivo.etag}-{codificacao}'
+
+        if not arquivo.imutavel and etag in request.if_none_match:
+            resposta = Response(status=304)
+        else:
+            resposta = Response(arquivo.variantes[codificacao], mimetype=arquivo.mimetype)
+            if codificacao != 'identity':
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if arquivo.imutavel else CACHE_REVALIDAR
+        resposta.vary.add('Accept-Encoding')
+        return resposta
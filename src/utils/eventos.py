@@ -0,0 +1,130 @@
+from collections import deque
+from threading import Lock, Thread
+import json
+import logging
+import os
+import queue
+import time
+
+# Cada conexão SSE ocupa uma thread do worker gthread durante toda a sua
+# duração; o limite fica bem abaixo de --threads para sobrar thread para a API
+SSE_MAX_CONEXOES = int(os.environ.get('SSE_MAX_CONEXOES', 10))
+
+
+class LimiteAssinantesExcedido(Exception):
+    pass
+
+
+class Assinatura:
+    """Fila de eventos de um cliente conectado"""
+
+    def __init__(self, tamanho_buffer):
+        self.fila = queue.Queue(maxsize=tamanho_buffer)
+        self.atrasada = False
+
+
+class HubEventos:
+    """
+    Distribui eventos de reuniões para os clientes SSE conectados neste
+    processo. Cada cliente tem uma fila limitada; um cliente lento que
+    enche a fila perde os eventos seguintes e recebe um pedido de recarga.
+
+    Commits feitos neste processo são publicados pelo hook da blueprint.
+    Para enxergar commits de outros workers, uma thread consulta
+    periodicamente o contador de versão de reuniao enquanto houver clientes.
+    """
+
+    def __init__(self, tamanho_buffer=100, max_assinantes=SSE_MAX_CONEXOES, intervalo_consulta=2.0):
+        self.tamanho_buffer = tamanho_buffer
+        self.max_assinantes = max_assinantes
+        self.intervalo_consulta = intervalo_consulta
+        self._assinaturas = set()
+        self._lock = Lock()
+        self._publicadas = deque(maxlen=1000)
+        self._versao_consultada = None
+        self._consultar = None
+        self._thread = None
+        self._pid = None
+
+    def configurar(self, consultar):
+        """
+        `consultar(desde)` deve retornar (versao_atual, eventos) com os
+        eventos de versão maior que `desde`; com desde=None, apenas a versão.
+        """
+        self._consultar = consultar
+
+    def assinar(self):
+        with self._lock:
+            if len(self._assinaturas) >= self.max_assinantes:
+                raise LimiteAssinantesExcedido()
+            assinatura = Assinatura(self.tamanho_buffer)
+            self._assinaturas.add(assinatura)
+        self._garantir_consulta()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, evento):
+        """Entrega um evento a todos os clientes, uma única vez por versão"""
+        with self._lock:
+            chave = (evento.get('id'), evento.get('versao'))
+            if chave in self._publicadas:
+                return
+            self._publicadas.append(chave)
+            assinaturas = list(self._assinaturas)
+
+        for assinatura in assinaturas:
+            if assinatura.atrasada:
+                continue
+            try:
+                assinatura.fila.put_nowait(evento)
+            except queue.Full:
+                assinatura.atrasada = True
+
+    def total_assinantes(self):
+        return len(self._assinaturas)
+
+    def _garantir_consulta(self):
+        # Threads não sobrevivem ao fork do gunicorn; uma por processo
+        if self._consultar is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._versao_consultada = None
+            self._thread = Thread(target=self._laco_consulta, name='hub-eventos', daemon=True)
+            self._thread.start()
+
+    def _laco_consulta(self):
+        while True:
+            with self._lock:
+                if not self._assinaturas:
+                    self._thread = None
+                    return
+            try:
+                versao, eventos = self._consultar(self._versao_consultada)
+                for evento in eventos:
+                    self.publicar(evento)
+                self._versao_consultada = versao
+            except Exception as e:
+                logging.warning(f"Erro ao consultar alterações para o SSE: {str(e)}")
+            time.sleep(self.intervalo_consulta)
+
+
+def formatar_sse(evento=None, nome=None, evento_id=None, comentario=None):
+    """Formata uma mensagem no protocolo text/event-stream"""
+    if comentario is not None:
+        return f': {comentario}\n\n'
+    linhas = []
+    if evento_id is not None:
+        linhas.append(f'id: {evento_id}')
+    if nome:
+        linhas.append(f'event: {nome}')
+    linhas.append(f'data: {json.dumps(evento)}')
+    return '\n'.join(linhas) + '\n\n'
+
+
+hub_eventos = HubEventos()
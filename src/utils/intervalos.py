@@ -0,0 +1,301 @@
+from bisect import bisect_left, insort
+import heapq
+from datetime import datetime, timedelta, timezone
+from threading import RLock
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import logging
+import os
+import time
+
+
+# Fuso do expediente na busca de horários livres, quando o cliente não informa
+FUSO_HORARIO_PADRAO = os.environ.get('FUSO_HORARIO_PADRAO', 'UTC')
+
+
+def para_utc(momento):
+    """
+    Datetime ingênuo em UTC, como as datas gravadas no banco. Datas com
+    fuso (ex.: o 'Z' do toISOString do navegador) são convertidas, para que
+    possam ser comparadas com as lidas do banco.
+    """
+    if momento is not None and momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def ler_data_hora(texto):
+    """Lê uma data ISO 8601, com ou sem fuso, como UTC ingênuo"""
+    return para_utc(datetime.fromisoformat(texto.replace('Z', '+00:00')))
+
+
+def ler_fuso(texto):
+    """
+    Fuso horário a partir de um nome IANA ('America/Sao_Paulo') ou de um
+    deslocamento em relação a UTC ('-03:00'). Levanta ValueError se inválido.
+    """
+    texto = (texto or '').strip()
+    if texto[:1] in ('+', '-'):
+        try:
+            horas, _, minutos = texto[1:].partition(':')
+            deslocamento = timedelta(hours=int(horas), minutes=int(minutos or 0))
+            return timezone(-deslocamento if texto[0] == '-' else deslocamento)
+        except ValueError:
+            raise ValueError(f'Fuso horário inválido: {texto}')
+    try:
+        return ZoneInfo(texto)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Fuso horário inválido: {texto}')
+
+
+def mesclar_intervalos(intervalos):
+    """Une intervalos sobrepostos ou encostados, devolvendo-os ordenados"""
+    mesclados = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1][1] = fim
+        else:
+            mesclados.append([inicio, fim])
+    return [(inicio, fim) for inicio, fim in mesclados]
+
+
+def arredondar_para_cima(momento, passo):
+    """Arredonda um datetime para o próximo múltiplo de `passo`"""
+    resto = (momento - datetime.min) % passo
+    return momento + (passo - resto) if resto else momento
+
+
+def horarios_livres(ocupados, inicio, fim, duracao, hora_inicio, hora_fim, limite,
+                    fim_de_semana=False, arredondamento=timedelta(minutes=5), fuso=timezone.utc):
+    """
+    Percorre em uma única passada os intervalos ocupados (mesclados) e o
+    expediente de cada dia entre `inicio` e `fim`, retornando até `limite`
+    lacunas (inicio, livre_ate) onde cabe uma reunião de `duracao`.
+
+    O expediente (`hora_inicio`-`hora_fim`) e os dias úteis são do horário
+    local em `fuso`; as datas recebidas e retornadas são UTC ingênuo.
+    """
+    inicio, fim = para_utc(inicio), para_utc(fim)
+    ocupados = mesclar_intervalos(ocupados)
+    livres = []
+    pos = 0
+    dia = inicio.replace(tzinfo=timezone.utc).astimezone(fuso).date()
+    ultimo_dia = fim.replace(tzinfo=timezone.utc).astimezone(fuso).date()
+
+    while dia <= ultimo_dia and len(livres) < limite:
+        if fim_de_semana or dia.weekday() < 5:
+            cursor = max(para_utc(datetime.combine(dia, hora_inicio, tzinfo=fuso)), inicio)
+            fim_expediente = min(para_utc(datetime.combine(dia, hora_fim, tzinfo=fuso)), fim)
+
+            # Descartar intervalos que terminam antes do expediente
+            while pos < len(ocupados) and ocupados[pos][1] <= cursor:
+                pos += 1
+
+            atual = pos
+            while cursor < fim_expediente and len(livres) < limite:
+                cursor = arredondar_para_cima(cursor, arredondamento)
+                if atual < len(ocupados) and ocupados[atual][0] < fim_expediente:
+                    lacuna_fim = min(ocupados[atual][0], fim_expediente)
+                else:
+                    lacuna_fim = fim_expediente
+
+                if lacuna_fim - cursor >= duracao:
+                    livres.append((cursor, lacuna_fim))
+
+                if lacuna_fim >= fim_expediente:
+                    break
+                cursor = max(cursor, ocupados[atual][1])
+                atual += 1
+
+        dia += timedelta(days=1)
+
+    return livres
+
+
+def conflitos_em_lote(ocorrencias, ocupados):
+    """
+    Verifica várias ocorrências contra o mesmo conjunto de intervalos em
+    uma única passada. `ocorrencias` são tuplas (inicio, fim) e `ocupados`
+    tuplas (inicio, fim, dado). Retorna, para cada ocorrência, a lista de
+    dados dos intervalos que se sobrepõem a ela.
+    """
+    ordem = sorted(range(len(ocorrencias)), key=lambda i: ocorrencias[i])
+    ocupados = sorted(ocupados, key=lambda o: o[0])
+    resultado = [[] for _ in ocorrencias]
+    ativos = []
+    pos = 0
+
+    for i in ordem:
+        inicio, fim = ocorrencias[i]
+        while pos < len(ocupados) and ocupados[pos][0] < fim:
+            heapq.heappush(ativos, (ocupados[pos][1], pos))
+            pos += 1
+        while ativos and ativos[0][0] <= inicio:
+            heapq.heappop(ativos)
+        resultado[i] = [ocupados[p][2] for _, p in ativos]
+
+    return resultado
+
+
+class IndiceIntervalos:
+    """
+    Intervalos [inicio, fim) ordenados pelo início.
+    Guarda a maior duração vista para que a busca por sobreposição comece
+    em inicio - maior_duracao, ficando em O(log n + k).
+    """
+
+    def __init__(self, intervalos=()):
+        self._itens = {}
+        self._chaves = []
+        self._maior_duracao = timedelta(0)
+        for item_id, inicio, fim in intervalos:
+            inicio, fim = para_utc(inicio), para_utc(fim)
+            self._itens[item_id] = (inicio, fim)
+            self._maior_duracao = max(self._maior_duracao, fim - inicio)
+        self._chaves = sorted((inicio, item_id) for item_id, (inicio, _) in self._itens.items())
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, item_id, inicio, fim):
+        inicio, fim = para_utc(inicio), para_utc(fim)
+        self.remover(item_id)
+        self._itens[item_id] = (inicio, fim)
+        self._maior_duracao = max(self._maior_duracao, fim - inicio)
+        insort(self._chaves, (inicio, item_id))
+
+    def remover(self, item_id):
+        atual = self._itens.pop(item_id, None)
+        if atual is None:
+            return
+        pos = bisect_left(self._chaves, (atual[0], item_id))
+        if pos < len(self._chaves) and self._chaves[pos] == (atual[0], item_id):
+            del self._chaves[pos]
+
+    def sobrepostos(self, inicio, fim):
+        """Ids dos intervalos que se sobrepõem a [inicio, fim)"""
+        inicio, fim = para_utc(inicio), para_utc(fim)
+        pos = bisect_left(self._chaves, (inicio - self._maior_duracao,))
+        encontrados = []
+        while pos < len(self._chaves):
+            chave_inicio, item_id = self._chaves[pos]
+            if chave_inicio >= fim:
+                break
+            if self._itens[item_id][1] > inicio:
+                encontrados.append(item_id)
+            pos += 1
+        return encontrados
+
+
+class IndiceSalas:
+    """
+    Índice em memória das reuniões ativas de cada sala.
+    Cada sala é carregada na primeira consulta através da função `carregar`,
+    que deve devolver tuplas (id, data_inicio, data_fim), e expira após `ttl`
+    segundos.
+
+    Para acompanhar commits de outros processos, `versao_atual()` devolve o
+    contador de versão das reuniões e `alteracoes_desde(versao)` as linhas
+    (id, sala_id, data_inicio, data_fim, ativa) alteradas depois dele. Cada
+    consulta compara o contador e, se mudou, aplica só essas alterações.
+    """
+
+    def __init__(self, carregar, ttl=30, versao_atual=None, alteracoes_desde=None):
+        self._carregar = carregar
+        self.ttl = ttl
+        self._versao_atual = versao_atual
+        self._alteracoes_desde = alteracoes_desde
+        self._versao = None
+        self._lock = RLock()
+        self._salas = {}
+        self._carregado_em = {}
+        self._geracao = {}
+        self._sala_de = {}
+
+    def _sincronizar(self):
+        """Aplica os commits de outros processos desde a última consulta"""
+        if self._versao_atual is None:
+            return
+        atual = self._versao_atual()
+        with self._lock:
+            vista = self._versao
+        if vista == atual:
+            return
+        if vista is None or atual < vista:
+            # Sem referência (ou banco trocado): as salas carregadas podem estar defasadas
+            self.invalidar()
+        else:
+            # O contador é lido antes das linhas, então nada confirmado até
+            # `atual` fica de fora; reaplicar uma linha é inofensivo
+            for reuniao_id, sala_id, inicio, fim, ativa in self._alteracoes_desde(vista):
+                self.registrar(reuniao_id, sala_id, inicio, fim, ativa)
+        with self._lock:
+            if self._versao is None or self._versao < atual:
+                self._versao = atual
+
+    def conflitos(self, sala_id, inicio, fim, ignorar_id=None):
+        """Ids das reuniões da sala que se sobrepõem a [inicio, fim)"""
+        self._sincronizar()
+        indice = self._obter(sala_id)
+        with self._lock:
+            ids = indice.sobrepostos(inicio, fim)
+        return [item_id for item_id in ids if item_id != ignorar_id]
+
+    def registrar(self, reuniao_id, sala_id, inicio, fim, ativa=True):
+        """Atualiza o índice com o estado confirmado de uma reunião"""
+        with self._lock:
+            sala_anterior = self._sala_de.pop(reuniao_id, None)
+            if sala_anterior is not None and sala_anterior in self._salas:
+                self._salas[sala_anterior].remover(reuniao_id)
+            # Impede que um carregamento em andamento grave um estado
+            # anterior a este commit
+            self._geracao[sala_id] = self._geracao.get(sala_id, 0) + 1
+            if sala_id not in self._salas:
+                return
+            if ativa:
+                self._salas[sala_id].adicionar(reuniao_id, inicio, fim)
+                self._sala_de[reuniao_id] = sala_id
+
+    def invalidar(self, sala_id=None):
+        """Descarta uma sala (ou todas) para recarregar na próxima consulta"""
+        with self._lock:
+            if sala_id is None:
+                self._versao = None
+            salas = list(self._salas) if sala_id is None else [sala_id]
+            for sala in salas:
+                indice = self._salas.pop(sala, None)
+                self._carregado_em.pop(sala, None)
+                self._geracao[sala] = self._geracao.get(sala, 0) + 1
+                if indice is not None:
+                    for item_id in list(indice._itens):
+                        self._sala_de.pop(item_id, None)
+
+    def _obter(self, sala_id):
+        with self._lock:
+            indice = self._salas.get(sala_id)
+            if indice is not None and time.monotonic() - self._carregado_em[sala_id] < self.ttl:
+                return indice
+
+        for _ in range(3):
+            with self._lock:
+                geracao = self._geracao.get(sala_id, 0)
+            inicio_carga = time.monotonic()
+            linhas = list(self._carregar(sala_id))
+            indice = IndiceIntervalos(linhas)
+
+            with self._lock:
+                if self._geracao.get(sala_id, 0) != geracao:
+                    # Um commit chegou durante a consulta; carregar de novo
+                    continue
+                anterior = self._salas.get(sala_id)
+                if anterior is not None:
+                    for item_id in anterior._itens:
+                        self._sala_de.pop(item_id, None)
+                self._salas[sala_id] = indice
+                self._carregado_em[sala_id] = inicio_carga
+                for item_id, _, _ in linhas:
+                    self._sala_de[item_id] = sala_id
+                return indice
+
+        logging.warning(f"Índice da sala {sala_id} não estabilizou; usando carga sem cache")
+        return indice
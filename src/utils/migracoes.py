@@ -0,0 +1,129 @@
+"""
+Migrações versionadas do banco de dados.
+
+db.create_all() só cria tabelas que ainda não existem; alterações em
+tabelas existentes (índices, colunas novas) ficam registradas aqui e são
+aplicadas em ordem, uma única vez, em bancos já existentes. Cada migração
+deve ser idempotente, pois bancos novos já nascem com o esquema atual.
+"""
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from src.models.user import db
+from src.models.versao import TABELAS_VERSIONADAS, versao_tabela
+import logging
+
+versao_esquema = db.Table('versao_esquema',
+    db.Column('versao', db.Integer, primary_key=True),
+    db.Column('descricao', db.String(200), nullable=False),
+    db.Column('aplicada_em', db.DateTime, nullable=False)
+)
+
+
+def _criar_indice(conn, tabela, nome):
+    """Cria um índice declarado nos modelos, se ainda não existir"""
+    indice = next(i for i in db.metadata.tables[tabela].indexes if i.name == nome)
+    indice.create(conn, checkfirst=True)
+
+
+def _migracao_1_indices_agendamento(conn):
+    _criar_indice(conn, 'reuniao', 'ix_reuniao_sala_ativa_periodo')
+    _criar_indice(conn, 'reuniao', 'ix_reuniao_ativas_periodo')
+    _criar_indice(conn, 'participantes_reuniao', 'ix_participantes_reuniao_user')
+
+
+def _migracao_2_versoes_tabelas(conn):
+    versao_tabela.create(conn, checkfirst=True)
+    existentes = {linha[0] for linha in conn.execute(db.select(versao_tabela.c.tabela))}
+    for tabela in TABELAS_VERSIONADAS:
+        if tabela not in existentes:
+            conn.execute(versao_tabela.insert().values(tabela=tabela, versao=0))
+
+
+def _adicionar_coluna(conn, tabela, coluna, definicao):
+    """ALTER TABLE ADD COLUMN, se a coluna ainda não existir"""
+    colunas = {c['name'] for c in inspect(conn).get_columns(tabela)}
+    if coluna not in colunas:
+        conn.execute(db.text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}'))
+
+
+def _migracao_3_alteracoes_reuniao(conn):
+    _adicionar_coluna(conn, 'reuniao', 'atualizado_em', 'DATETIME')
+    _adicionar_coluna(conn, 'reuniao', 'versao', 'INTEGER NOT NULL DEFAULT 0')
+    conn.execute(db.text('UPDATE reuniao SET atualizado_em = criado_em WHERE atualizado_em IS NULL'))
+    _criar_indice(conn, 'reuniao', 'ix_reuniao_versao')
+
+
+def _migracao_4_reuniao_autoincrement(conn):
+    """
+    Sem AUTOINCREMENT o SQLite reaproveita o maior id depois que o
+    arquivamento o remove, colidindo com o id guardado no histórico. A
+    tabela é recriada com AUTOINCREMENT (o SQLite não altera isso com
+    ALTER TABLE) e a sequência parte do maior id já usado nas duas tabelas.
+    No Postgres as sequências nunca voltam atrás e nada precisa mudar.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    tabela = db.metadata.tables['reuniao']
+    ddl = conn.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'reuniao'"
+    )).scalar()
+    if 'AUTOINCREMENT' not in ddl.upper():
+        # Procedimento recomendado pelo SQLite: nova tabela, cópia, troca de nome
+        criar = str(CreateTable(tabela).compile(dialect=conn.dialect))
+        conn.execute(db.text(criar.replace('CREATE TABLE reuniao ', 'CREATE TABLE reuniao_nova ', 1)))
+        colunas = ', '.join(c.name for c in tabela.columns)
+        conn.execute(db.text(f'INSERT INTO reuniao_nova ({colunas}) SELECT {colunas} FROM reuniao'))
+        conn.execute(db.text('DROP TABLE reuniao'))
+        conn.execute(db.text('ALTER TABLE reuniao_nova RENAME TO reuniao'))
+        for indice in tabela.indexes:
+            indice.create(conn, checkfirst=True)
+
+    maior = conn.execute(db.text(
+        'SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM reuniao'
+        ' UNION ALL SELECT MAX(id) FROM reuniao_historico)'
+    )).scalar() or 0
+    conn.execute(db.text("DELETE FROM sqlite_sequence WHERE name = 'reuniao'"))
+    conn.execute(db.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('reuniao', :seq)"), {'seq': maior})
+
+
+# (versão, descrição, função que recebe a conexão dentro da transação)
+MIGRACOES = [
+    (1, 'Índices compostos de reuniao e participantes_reuniao', _migracao_1_indices_agendamento),
+    (2, 'Contadores de versão por tabela', _migracao_2_versoes_tabelas),
+    (3, 'Colunas versao e atualizado_em em reuniao', _migracao_3_alteracoes_reuniao),
+    (4, 'AUTOINCREMENT em reuniao para não reaproveitar ids arquivados', _migracao_4_reuniao_autoincrement),
+]
+
+
+def versoes_aplicadas(conn):
+    return {linha[0] for linha in conn.execute(db.select(versao_esquema.c.versao))}
+
+
+def aplicar_migracoes(engine=None):
+    """Aplica as migrações pendentes, cada uma em sua própria transação"""
+    engine = engine or db.engine
+    versao_esquema.create(engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        aplicadas = versoes_aplicadas(conn)
+
+    pendentes = [m for m in MIGRACOES if m[0] not in aplicadas]
+    for versao, descricao, migrar in pendentes:
+        try:
+            with engine.begin() as conn:
+                migrar(conn)
+                conn.execute(versao_esquema.insert().values(
+                    versao=versao, descricao=descricao, aplicada_em=datetime.utcnow()
+                ))
+            logging.info(f"Migração {versao} aplicada: {descricao}")
+        except (IntegrityError, OperationalError, ProgrammingError):
+            # Outro processo pode ter aplicado a mesma migração ao mesmo tempo
+            with engine.connect() as conn:
+                if versao not in versoes_aplicadas(conn):
+                    raise
+            logging.info(f"Migração {versao} já aplicada por outro processo")
+
+    return [m[0] for m in pendentes]
+
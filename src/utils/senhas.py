@@ -0,0 +1,98 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+from werkzeug.security import check_password_hash, generate_password_hash
+import atexit
+import logging
+import multiprocessing
+import os
+
+# Método do werkzeug para novos hashes, com parâmetros de custo
+# (ex.: 'scrypt:32768:8:1' ou 'pbkdf2:sha256:600000')
+SENHA_METODO = os.environ.get('SENHA_METODO', 'scrypt')
+
+# Processos dedicados ao hash por worker; 0 calcula na própria thread
+SENHA_PROCESSOS = int(os.environ.get('SENHA_PROCESSOS', min(4, os.cpu_count() or 1)))
+
+# Hashes simultâneos por worker e tempo máximo de espera por uma vaga, em segundos
+SENHA_CONCORRENCIA = int(os.environ.get('SENHA_CONCORRENCIA', max(1, SENHA_PROCESSOS) * 2))
+SENHA_ESPERA = float(os.environ.get('SENHA_ESPERA', 10))
+
+
+class SobrecargaSenhas(Exception):
+    """Muitos hashes de senha em andamento; a requisição deve ser recusada"""
+    pass
+
+
+class ExecutorSenhas:
+    """
+    Calcula hashes de senha (scrypt/pbkdf2, propositalmente caros) em um pool
+    de processos, fora do GIL, para que uma rajada de logins não trave todas
+    as threads do worker. Um semáforo limita quantos hashes ficam em
+    andamento; quem não consegue vaga dentro de `espera` recebe
+    SobrecargaSenhas em vez de enfileirar indefinidamente.
+
+    O pool é criado sob demanda em cada processo (não sobrevive ao fork do
+    gunicorn) e usa o método 'forkserver', seguro com threads em execução.
+    """
+
+    def __init__(self, metodo=SENHA_METODO, processos=SENHA_PROCESSOS,
+                 concorrencia=SENHA_CONCORRENCIA, espera=SENHA_ESPERA):
+        self.metodo = metodo
+        self.processos = processos
+        self.espera = espera
+        self._vagas = BoundedSemaphore(concorrencia)
+        self._pool = None
+        self._pid = None
+        self._lock = Lock()
+        self._prefixo = None
+
+    def _obter_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                metodos = multiprocessing.get_all_start_methods()
+                contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _executar(self, funcao, *args):
+        if not self._vagas.acquire(timeout=self.espera):
+            raise SobrecargaSenhas()
+        try:
+            if not self.processos:
+                return funcao(*args)
+            try:
+                return self._obter_pool().submit(funcao, *args).result()
+            except BrokenProcessPool:
+                # Um processo do pool morreu; recria o pool e tenta de novo
+                logging.warning("Pool de hash de senhas quebrado, recriando")
+                with self._lock:
+                    self._pool = None
+                return self._obter_pool().submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+
+    def gerar_hash(self, senha):
+        return self._executar(generate_password_hash, senha, self.metodo)
+
+    def verificar(self, hash_senha, senha):
+        return self._executar(check_password_hash, hash_senha, senha)
+
+    def precisa_rehash(self, hash_senha):
+        """Verdadeiro se o hash foi gerado com método ou custo diferente do atual"""
+        if self._prefixo is None:
+            # O werkzeug completa os parâmetros padrão ('scrypt' -> 'scrypt:32768:8:1')
+            self._prefixo = generate_password_hash('', self.metodo).split('$', 1)[0]
+        return hash_senha.split('$', 1)[0] != self._prefixo
+
+    def encerrar(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+executor_senhas = ExecutorSenhas()
+# Encerra o pool do processo (e o forkserver) na saída ou no reload do worker
+atexit.register(executor_senhas.encerrar)
@@ -0,0 +1,105 @@
+from threading import Event, Lock, Thread
+from sqlalchemy import bindparam
+from src.models.user import User, db
+from src.models.versao import VERSAO_ULTIMO_LOGIN, incrementar_versoes
+import atexit
+import logging
+import os
+
+
+class BufferUltimoLogin:
+    """
+    Write-behind do último login: o login apenas registra o horário em
+    memória e uma thread grava todos os pendentes em um único UPDATE em lote
+    a cada `intervalo` segundos (e no encerramento do processo), em vez de
+    uma escrita por login. O valor no banco fica eventualmente consistente.
+    """
+
+    def __init__(self, intervalo=5.0):
+        self.intervalo = intervalo
+        self._pendentes = {}
+        self._lock = Lock()
+        self._parar = Event()
+        self._app = None
+        self._thread = None
+        self._pid = None
+        self.gravados = 0
+
+    def configurar(self, app):
+        self._app = app
+
+    def registrar(self, user_id, quando):
+        with self._lock:
+            anterior = self._pendentes.get(user_id)
+            if anterior is None or quando > anterior:
+                self._pendentes[user_id] = quando
+        self._garantir_thread()
+
+    def _garantir_thread(self):
+        # Threads não sobrevivem ao fork do gunicorn; uma por processo
+        if self._app is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._thread = Thread(target=self._laco, name='ultimo-login', daemon=True)
+            self._thread.start()
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.gravar()
+            except Exception as e:
+                logging.error(f"Erro ao gravar último login: {str(e)}")
+
+    def gravar(self):
+        """Grava os horários pendentes em um único executemany"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return 0
+
+        tabela = User.__table__
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(
+                        tabela.update()
+                        .where(tabela.c.id == bindparam('uid'))
+                        .values(ultimo_login=bindparam('quando')),
+                        [{'uid': uid, 'quando': quando} for uid, quando in pendentes.items()]
+                    )
+                    # ultimo_login só aparece em GET /api/users; um contador próprio
+                    # evita invalidar as listagens de reuniões a cada lote
+                    incrementar_versoes(conn, [VERSAO_ULTIMO_LOGIN])
+        except Exception:
+            # Devolve ao buffer sem sobrescrever logins mais recentes
+            with self._lock:
+                for uid, quando in pendentes.items():
+                    atual = self._pendentes.get(uid)
+                    if atual is None or quando > atual:
+                        self._pendentes[uid] = quando
+            raise
+        self.gravados += len(pendentes)
+        return len(pendentes)
+
+    def encerrar(self):
+        self._parar.set()
+        if self._app is not None and self._pid == os.getpid():
+            try:
+                self.gravar()
+            except Exception as e:
+                logging.error(f"Erro ao gravar último login no encerramento: {str(e)}")
+
+    def pendentes(self):
+        return len(self._pendentes)
+
+
+buffer_ultimo_login = BufferUltimoLogin(intervalo=float(os.environ.get('ULTIMO_LOGIN_INTERVALO', 5)))
+atexit.register(buffer_ultimo_login.encerrar)
+
+
+def configurar_buffer_ultimo_login(app):
+    buffer_ultimo_login.configurar(app)
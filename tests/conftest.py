@@ -0,0 +1,38 @@
+import pytest
+from src.main import create_app, inicializar_banco
+from src.models.reuniao import indice_salas
+from src.models.user import User, db
+from src.utils.email_service import despacho_emails
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}",
+        'CACHE_CALENDARIO_ARQUIVO': str(tmp_path / 'cache_calendario.db'),
+    })
+    with app.app_context():
+        inicializar_banco()
+        for nome in ('ana', 'bruno'):
+            usuario = User(username=nome, email=f'{nome}@exemplo.com')
+            usuario.password_hash = 'sem-senha'
+            db.session.add(usuario)
+        db.session.commit()
+    # Sem envio de emails em segundo plano nos testes
+    despacho_emails.configurar(None)
+    # O índice de salas é global ao processo; cada teste parte do banco
+    indice_salas.invalidar()
+    yield app
+    indice_salas.invalidar()
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Cliente com a sessão do usuário 1 já autenticada"""
+    client = app.test_client()
+    with client.session_transaction() as sessao:
+        sessao['user_id'] = 1
+    return client
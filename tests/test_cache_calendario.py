@@ -0,0 +1,48 @@
+from datetime import datetime
+import sqlite3
+
+from src.utils.cache_calendario import BackendMemoria, BackendSQLite, CacheCalendario
+
+
+def test_backend_sqlite_compartilha_invalidacoes(tmp_path):
+    # Dois workers usando o mesmo arquivo
+    worker_a = CacheCalendario(BackendSQLite(str(tmp_path / 'cache.db')))
+    worker_b = CacheCalendario(BackendSQLite(str(tmp_path / 'cache.db')))
+
+    _, geracao = worker_a.obter(2030, 3)
+    worker_a.guardar(2030, 3, '{"eventos": []}', geracao)
+    assert worker_b.obter(2030, 3)[0] == '{"eventos": []}'
+
+    worker_a.backend.invalidar([CacheCalendario.chave(2030, 3)])
+    assert worker_b.obter(2030, 3)[0] is None
+
+
+def test_backend_memoria_expira_pelo_ttl(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr('src.utils.cache_calendario.time.monotonic', lambda: agora[0])
+    cache = CacheCalendario(BackendMemoria(ttl=30))
+
+    _, geracao = cache.obter(2030, 3)
+    cache.guardar(2030, 3, '{}', geracao)
+    agora[0] += 29
+    assert cache.obter(2030, 3)[0] == '{}'
+    agora[0] += 1
+    assert cache.obter(2030, 3)[0] is None
+
+
+class BackendQuebrado(BackendMemoria):
+    def invalidar(self, chaves):
+        raise sqlite3.OperationalError('database is locked')
+
+    def limpar(self):
+        raise sqlite3.OperationalError('database is locked')
+
+
+def test_falha_ao_invalidar_nao_derruba_a_requisicao(app, client, monkeypatch):
+    monkeypatch.setattr('src.routes.user.cache_calendario', CacheCalendario(BackendQuebrado()))
+
+    resposta = client.put('/api/users/2', json={'username': 'bruno.silva'})
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['username'] == 'bruno.silva'
+    CacheCalendario(BackendQuebrado()).invalidar_periodos([(datetime(2030, 3, 1), datetime(2030, 3, 2))])
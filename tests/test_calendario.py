@@ -0,0 +1,24 @@
+from datetime import datetime
+
+
+class Relogio(datetime):
+    agora = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.agora
+
+
+def test_etag_do_mes_atual_muda_na_virada_do_mes(client, monkeypatch):
+    monkeypatch.setattr('src.routes.reuniao.datetime', Relogio)
+    Relogio.agora = datetime(2030, 1, 31, 12)
+    janeiro = client.get('/api/reunioes/calendario')
+    assert janeiro.status_code == 200
+
+    Relogio.agora = datetime(2030, 2, 1, 8)
+    fevereiro = client.get('/api/reunioes/calendario', headers={'If-None-Match': janeiro.headers['ETag']})
+    assert fevereiro.status_code == 200
+    assert fevereiro.headers['ETag'] != janeiro.headers['ETag']
+
+    repetida = client.get('/api/reunioes/calendario', headers={'If-None-Match': fevereiro.headers['ETag']})
+    assert repetida.status_code == 304
@@ -0,0 +1,124 @@
+from src.utils.email_service import ConexaoSMTP, enviar_lote
+from threading import Lock, Thread
+import pytest
+import socket
+import socketserver
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo, sem TLS nem autenticação, que conta conexões e mensagens"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SessaoSMTP)
+        self.conexoes = 0
+        self.mensagens = []
+        self.sockets = set()
+        self.lock = Lock()
+
+    def derrubar(self):
+        """Fecha as conexões abertas, como um servidor que encerra sessões ociosas"""
+        with self.lock:
+            for sock in list(self.sockets):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class SessaoSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linha):
+        self.wfile.write(linha.encode() + b'\r\n')
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.conexoes += 1
+            servidor.sockets.add(self.connection)
+        try:
+            self.responder('220 localhost ESMTP teste')
+            destinatarios = []
+            while True:
+                linha = self.rfile.readline()
+                if not linha:
+                    return
+                comando = linha.decode().strip().upper()
+                if comando.startswith(('EHLO', 'HELO')):
+                    self.responder('250 localhost')
+                elif comando.startswith('MAIL'):
+                    destinatarios = []
+                    self.responder('250 OK')
+                elif comando.startswith('RCPT'):
+                    destinatarios.append(linha.decode().split(':', 1)[1].strip())
+                    self.responder('250 OK')
+                elif comando == 'DATA':
+                    self.responder('354 fim com <CRLF>.<CRLF>')
+                    corpo = []
+                    while (linha := self.rfile.readline()) not in (b'.\r\n', b''):
+                        corpo.append(linha)
+                    with servidor.lock:
+                        servidor.mensagens.append((destinatarios, b''.join(corpo)))
+                    self.responder('250 OK')
+                elif comando == 'QUIT':
+                    self.responder('221 tchau')
+                    return
+                else:
+                    self.responder('250 OK')
+        except OSError:
+            return
+        finally:
+            with servidor.lock:
+                servidor.sockets.discard(self.connection)
+
+
+@pytest.fixture
+def servidor_smtp():
+    servidor = ServidorSMTP()
+    Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def conexao_local(servidor):
+    host, porta = servidor.server_address
+    return ConexaoSMTP(host=host, port=porta, usuario='', senha='', tls=False, timeout=5)
+
+
+def test_uma_conexao_envia_varias_mensagens(servidor_smtp):
+    conexao = conexao_local(servidor_smtp)
+    destinatarios = [f'pessoa{i}@exemplo.com' for i in range(5)]
+
+    falhas = enviar_lote(destinatarios, 'Assunto', '<p>corpo</p>', 'corpo', conexao=conexao)
+    conexao.fechar()
+
+    assert falhas == {}
+    assert servidor_smtp.conexoes == 1
+    assert conexao.conexoes == 1
+    assert [d for d, _ in servidor_smtp.mensagens] == [[f'<{d}>'] for d in destinatarios]
+
+
+def test_reconecta_quando_o_servidor_derruba_a_conexao(servidor_smtp):
+    conexao = conexao_local(servidor_smtp)
+    assert enviar_lote(['ana@exemplo.com'], 'Um', '<p>1</p>', conexao=conexao) == {}
+
+    servidor_smtp.derrubar()
+    assert enviar_lote(['bruno@exemplo.com', 'carla@exemplo.com'], 'Dois', '<p>2</p>', conexao=conexao) == {}
+    conexao.fechar()
+
+    assert servidor_smtp.conexoes == 2
+    assert conexao.conexoes == 2
+    assert len(servidor_smtp.mensagens) == 3
+
+
+def test_renova_a_conexao_apos_o_limite_de_mensagens(servidor_smtp):
+    conexao = conexao_local(servidor_smtp)
+    conexao.max_mensagens = 2
+
+    destinatarios = [f'pessoa{i}@exemplo.com' for i in range(5)]
+    assert enviar_lote(destinatarios, 'Assunto', '<p>corpo</p>', conexao=conexao) == {}
+    conexao.fechar()
+
+    assert servidor_smtp.conexoes == 3
+    assert len(servidor_smtp.mensagens) == 5
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from src.models.email_saida import EmailSaida
+from src.models.reuniao import Reuniao
+from src.models.user import db
+from src.utils.email_service import DespachoEmails, montar_mensagem, para
+import pytest
+
+
+def test_reserva_expirada_na_fila_nao_envia_duas_vezes(app):
+    despacho = DespachoEmails(workers=1, reserva=300)
+    with app.app_context():
+        db.session.add(EmailSaida(destinatarios=['ana@exemplo.com'], assunto='a', corpo_html='<p>a</p>'))
+        db.session.commit()
+
+        primeiro = despacho._reivindicar(10)
+        assert len(primeiro) == 1
+        token_antigo, email_id = primeiro[0][1], primeiro[0][2]
+
+        # A reserva expira enquanto a linha espera na fila e outro processo a retoma
+        EmailSaida.query.filter_by(id=email_id).update({'proxima_tentativa': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        segundo = despacho._reivindicar(10)
+        assert [item[2] for item in segundo] == [email_id]
+
+        assert despacho._renovar_reserva(email_id, token_antigo) is False
+        assert despacho._renovar_reserva(email_id, segundo[0][1]) is True
+
+
+def test_reuniao_nao_e_criada_sem_a_notificacao(app, client, monkeypatch):
+    def falhar(reuniao, participantes):
+        raise RuntimeError('template quebrado')
+    monkeypatch.setattr('src.routes.reuniao.enviar_notificacao_agendamento', falhar)
+
+    resposta = client.post('/api/reunioes', json={
+        'titulo': 'sem aviso', 'data_inicio': '2030-03-04T09:00:00Z', 'data_fim': '2030-03-04T10:00:00Z',
+        'sala_id': 1, 'participantes': [2]
+    })
+    assert resposta.status_code == 500
+    with app.app_context():
+        assert Reuniao.query.count() == 0
+        assert EmailSaida.query.count() == 0
+
+
+def test_cabecalho_to_codifica_nomes_e_recusa_quebras_de_linha():
+    mensagem = montar_mensagem('Assunto', '<p>corpo</p>', 'corpo')
+    recebida = message_from_bytes(para(mensagem, 'João Silva <joao@exemplo.com>'))
+    assert recebida['To'].isascii()
+    assert str(make_header(decode_header(recebida['To']))) == 'João Silva <joao@exemplo.com>'
+
+    with pytest.raises(ValueError):
+        para(mensagem, 'ana@exemplo.com\r\nBcc: outro@exemplo.com')
+
+
+def test_notificacao_da_serie_lista_regra_e_datas(app, client):
+    resposta = client.post('/api/reunioes/serie', json={
+        'titulo': 'semanal', 'data_inicio': '2030-03-04T09:00:00Z', 'data_fim': '2030-03-04T10:00:00Z',
+        'sala_id': 1, 'participantes': [2],
+        'recorrencia': {'frequencia': 'semanal', 'intervalo': 2, 'dias_semana': [0, 2], 'contagem': 3}
+    })
+    assert resposta.status_code == 201
+
+    with app.app_context():
+        email = EmailSaida.query.one()
+    assert email.assunto == 'Nova Série de Reuniões Agendada: semanal'
+    assert 'A cada 2 semanas (segunda, quarta), 3 ocorrências' in email.corpo_texto
+    for dia in ('04/03/2030', '06/03/2030', '18/03/2030'):
+        assert f'{dia} às 09:00 - 10:00' in email.corpo_texto
+        assert f'{dia} às 09:00 - 10:00' in email.corpo_html
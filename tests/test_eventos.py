@@ -0,0 +1,30 @@
+from src.models.versao import obter_versoes
+from src.utils.eventos import hub_eventos
+
+
+def test_limite_de_conexoes_sse_responde_503_com_retry_after(client, monkeypatch):
+    monkeypatch.setattr(hub_eventos, 'max_assinantes', 0)
+    resposta = client.get('/api/reunioes/eventos')
+    assert resposta.status_code == 503
+    assert int(resposta.headers['Retry-After']) > 0
+
+
+def test_reconexao_reenvia_alteracoes_desde_last_event_id(app, client):
+    with app.app_context():
+        antes = obter_versoes(['reuniao'])['reuniao']
+    criada = client.post('/api/reunioes', json={
+        'titulo': 'durante a reconexão', 'data_inicio': '2030-03-04T09:00:00Z',
+        'data_fim': '2030-03-04T10:00:00Z', 'sala_id': 1
+    }).get_json()['reuniao']
+
+    resposta = client.get('/api/reunioes/eventos', headers={'Last-Event-ID': str(antes)})
+    partes = iter(resposta.response)
+    try:
+        inicio = next(partes)
+        evento = next(partes)
+    finally:
+        resposta.close()
+
+    assert inicio.startswith(b'retry: 5000\nid: ')
+    assert evento.startswith(f'id: {antes + 1}\nevent: atualizada\n'.encode())
+    assert f'"id": {criada["id"]}'.encode() in evento
@@ -0,0 +1,26 @@
+from datetime import datetime, time, timedelta
+from src.models.reuniao import BUFFER_REUNIAO
+from src.utils.intervalos import conflitos_em_lote, horarios_livres
+
+
+def test_conflito_no_limite_do_buffer():
+    inicio, fim = datetime(2030, 3, 4, 9), datetime(2030, 3, 4, 10)
+    ocupados = [(inicio - BUFFER_REUNIAO, fim + BUFFER_REUNIAO, 'sala')]
+    ocorrencias = [
+        (fim + BUFFER_REUNIAO, fim + BUFFER_REUNIAO + timedelta(hours=1)),  # Encosta no buffer
+        (fim + BUFFER_REUNIAO - timedelta(minutes=1), fim + timedelta(hours=1)),  # Invade o buffer
+        (inicio - timedelta(hours=1), inicio - BUFFER_REUNIAO),  # Termina onde o buffer começa
+    ]
+    assert conflitos_em_lote(ocorrencias, ocupados) == [[], ['sala'], []]
+
+
+def test_horarios_livres_respeita_expediente_e_fim_de_semana():
+    ocupados = [(datetime(2030, 3, 8, 8), datetime(2030, 3, 8, 17))]  # Sexta
+    livres = horarios_livres(
+        ocupados, datetime(2030, 3, 8, 6), datetime(2030, 3, 11, 23), timedelta(minutes=60),
+        time(8), time(18), limite=5
+    )
+    assert livres == [
+        (datetime(2030, 3, 8, 17), datetime(2030, 3, 8, 18)),
+        (datetime(2030, 3, 11, 8), datetime(2030, 3, 11, 18)),  # Pula sábado e domingo
+    ]
@@ -0,0 +1,41 @@
+from datetime import date, datetime
+from src.models.recorrencia import RegraRecorrencia
+
+
+def regra(**campos):
+    campos.setdefault('intervalo', 1)
+    campos.setdefault('data_inicio', datetime(2030, 1, 31, 9))
+    campos.setdefault('data_fim', datetime(2030, 1, 31, 10))
+    return RegraRecorrencia(**campos)
+
+
+def test_mensal_no_dia_31_usa_o_ultimo_dia_do_mes():
+    ocorrencias = regra(frequencia='mensal', contagem=4).expandir()
+    assert [inicio.date() for inicio, _ in ocorrencias] == [
+        date(2030, 1, 31), date(2030, 2, 28), date(2030, 3, 31), date(2030, 4, 30)
+    ]
+    assert all((inicio.hour, fim.hour) == (9, 10) for inicio, fim in ocorrencias)
+
+
+def test_excecoes_contam_na_quantidade_de_ocorrencias():
+    ocorrencias = regra(frequencia='diaria', contagem=3, data_inicio=datetime(2030, 3, 4, 9),
+                        data_fim=datetime(2030, 3, 4, 10), excecoes=['2030-03-05']).expandir()
+    assert [inicio.date() for inicio, _ in ocorrencias] == [date(2030, 3, 4), date(2030, 3, 6)]
+
+
+def test_serie_com_valores_em_texto(client):
+    base = {'titulo': 'série', 'data_inicio': '2030-03-04T09:00:00Z', 'data_fim': '2030-03-04T10:00:00Z',
+            'sala_id': 1}
+
+    resposta = client.post('/api/reunioes/serie', json={
+        **base, 'recorrencia': {'frequencia': 'semanal', 'intervalo': '1', 'dias_semana': ['0', 2], 'contagem': '2'}
+    })
+    assert resposta.status_code == 201
+    assert [r['data_inicio'] for r in resposta.get_json()['reunioes']] == ['2030-03-04T09:00:00', '2030-03-06T09:00:00']
+
+    for recorrencia in ({'frequencia': 'diaria', 'intervalo': 'dois', 'contagem': 2},
+                        {'frequencia': 'diaria', 'contagem': [2]},
+                        {'frequencia': 'semanal', 'contagem': 2, 'dias_semana': 'segunda'},
+                        {'frequencia': 'semanal', 'contagem': 2, 'dias_semana': [True]}):
+        resposta = client.post('/api/reunioes/serie', json={**base, 'recorrencia': recorrencia})
+        assert resposta.status_code == 400, recorrencia
@@ -0,0 +1,110 @@
+from datetime import datetime
+from src.models.reuniao import Reuniao, indice_salas
+from src.models.user import db
+from src.models.versao import incrementar_versoes
+
+
+def criar_reuniao(client, titulo, inicio, fim, sala_id=1):
+    return client.post('/api/reunioes', json={
+        'titulo': titulo, 'data_inicio': inicio, 'data_fim': fim, 'sala_id': sala_id
+    })
+
+
+def test_datas_com_z_entram_no_indice_carregado_do_banco(app, client):
+    with app.app_context():
+        db.session.add(Reuniao(titulo='existente', data_inicio=datetime(2030, 3, 4, 9),
+                               data_fim=datetime(2030, 3, 4, 10), sala_id=1, criador_id=1))
+        db.session.commit()
+
+    # A primeira verificação carrega o índice da sala a partir do banco
+    resposta = criar_reuniao(client, 'conflitante', '2030-03-04T09:30:00.000Z', '2030-03-04T10:30:00.000Z')
+    assert resposta.status_code == 409
+
+    resposta = criar_reuniao(client, 't4', '2030-03-04T14:00:00.000Z', '2030-03-04T15:00:00.000Z')
+    assert resposta.status_code == 201
+    reuniao = resposta.get_json()['reuniao']
+    assert reuniao['data_inicio'] == '2030-03-04T14:00:00'
+
+    # A nova reunião está no índice, sem depender da consulta ao banco
+    with app.app_context():
+        assert indice_salas.conflitos(1, datetime(2030, 3, 4, 14, 30), datetime(2030, 3, 4, 14, 45)) == [reuniao['id']]
+
+    resposta = criar_reuniao(client, 'sobreposta', '2030-03-04T14:30:00.000Z', '2030-03-04T15:30:00.000Z')
+    assert resposta.status_code == 409
+
+
+def test_datas_com_fuso_sao_gravadas_em_utc(client):
+    resposta = criar_reuniao(client, 'fuso', '2030-03-05T09:00:00-03:00', '2030-03-05T10:00:00-03:00')
+    assert resposta.status_code == 201
+    assert resposta.get_json()['reuniao']['data_inicio'] == '2030-03-05T12:00:00'
+
+
+def test_horarios_livres_aceita_datas_com_z(app, client):
+    with app.app_context():
+        db.session.add(Reuniao(titulo='manhã', data_inicio=datetime(2030, 3, 4, 8),
+                               data_fim=datetime(2030, 3, 4, 12), sala_id=1, criador_id=1))
+        db.session.commit()
+
+    parametros = 'sala_id=1&duracao=60&inicio=2030-03-04T08:00:00.000Z&fim=2030-03-04T18:00:00.000Z'
+    resposta = client.get(f'/api/reunioes/horarios-livres?{parametros}')
+    assert resposta.status_code == 200
+    horarios = resposta.get_json()['horarios']
+    # Considera o buffer de 10 minutos após a reunião da manhã
+    assert horarios[0]['data_inicio'] == '2030-03-04T12:10:00'
+
+
+
+def test_horarios_livres_usa_expediente_no_fuso_informado(app, client):
+    with app.app_context():
+        # 09:00-12:00 em São Paulo (UTC-3)
+        db.session.add(Reuniao(titulo='manhã', data_inicio=datetime(2030, 3, 4, 12),
+                               data_fim=datetime(2030, 3, 4, 15), sala_id=1, criador_id=1))
+        db.session.commit()
+
+    # Domingo 22:00 local já é segunda em UTC; o expediente começa na segunda 08:00 local
+    parametros = ('sala_id=1&duracao=60&fuso=America/Sao_Paulo'
+                  '&inicio=2030-03-04T01:00:00Z&fim=2030-03-05T03:00:00Z')
+    resposta = client.get(f'/api/reunioes/horarios-livres?{parametros}')
+    assert resposta.status_code == 200
+    assert [(h['data_inicio'], h['livre_ate']) for h in resposta.get_json()['horarios']] == [
+        ('2030-03-04T15:10:00', '2030-03-04T21:00:00'),
+    ]
+
+    resposta = client.get(f'/api/reunioes/horarios-livres?{parametros.replace("America/Sao_Paulo", "-03:00")}')
+    assert resposta.get_json()['horarios'][0]['data_inicio'] == '2030-03-04T15:10:00'
+
+    resposta = client.get(f'/api/reunioes/horarios-livres?{parametros.replace("America/Sao_Paulo", "Lua/Base")}')
+    assert resposta.status_code == 400
+
+def gravar_por_outro_worker(app, valores, reuniao_id=None):
+    """Grava uma reunião fora da sessão do ORM, como faria outro processo"""
+    tabela = Reuniao.__table__
+    with app.app_context():
+        with db.engine.begin() as conn:
+            versao = incrementar_versoes(conn, ['reuniao'])['reuniao']
+            valores = dict(valores, versao=versao, atualizado_em=datetime.utcnow())
+            if reuniao_id is None:
+                conn.execute(tabela.insert().values(criado_em=datetime.utcnow(), ativa=True, criador_id=1, **valores))
+            else:
+                conn.execute(tabela.update().where(tabela.c.id == reuniao_id).values(**valores))
+
+
+def test_indice_enxerga_reuniao_criada_por_outro_worker(app, client):
+    assert criar_reuniao(client, 'carrega', '2030-03-04T07:00:00Z', '2030-03-04T07:30:00Z').status_code == 201
+
+    gravar_por_outro_worker(app, {'titulo': 'outro worker', 'sala_id': 1,
+                                  'data_inicio': datetime(2030, 3, 4, 9), 'data_fim': datetime(2030, 3, 4, 10)})
+
+    resposta = criar_reuniao(client, 'mesmo horário', '2030-03-04T09:00:00Z', '2030-03-04T10:00:00Z')
+    assert resposta.status_code == 409
+
+
+def test_reuniao_movida_por_outro_worker_nao_gera_conflito_falso(app, client):
+    resposta = criar_reuniao(client, 'manhã', '2030-03-04T09:00:00Z', '2030-03-04T10:00:00Z')
+    reuniao_id = resposta.get_json()['reuniao']['id']
+
+    gravar_por_outro_worker(app, {'data_inicio': datetime(2030, 3, 4, 15), 'data_fim': datetime(2030, 3, 4, 16)},
+                            reuniao_id=reuniao_id)
+
+    assert criar_reuniao(client, 'no lugar', '2030-03-04T09:00:00Z', '2030-03-04T10:00:00Z').status_code == 201
+    assert criar_reuniao(client, 'tarde', '2030-03-04T15:30:00Z', '2030-03-04T16:30:00Z').status_code == 409
@@ -0,0 +1,26 @@
+from datetime import datetime
+from src.models.user import User
+from src.models.versao import VERSAO_ULTIMO_LOGIN, obter_versoes
+from src.utils.ultimo_login import BufferUltimoLogin
+
+
+def test_lote_de_ultimo_login_nao_invalida_versao_de_user(app, client):
+    etag_reunioes = client.get('/api/reunioes').headers['ETag']
+    etag_usuarios = client.get('/api/users').headers['ETag']
+
+    buffer = BufferUltimoLogin(intervalo=3600)
+    buffer.configurar(app)
+    try:
+        buffer.registrar(1, datetime(2030, 3, 4, 9))
+        with app.app_context():
+            antes = obter_versoes(['user', VERSAO_ULTIMO_LOGIN])
+            assert buffer.gravar() == 1
+            depois = obter_versoes(['user', VERSAO_ULTIMO_LOGIN])
+            assert User.query.get(1).ultimo_login == datetime(2030, 3, 4, 9)
+    finally:
+        buffer._parar.set()
+
+    assert depois['user'] == antes['user']
+    assert depois[VERSAO_ULTIMO_LOGIN] == antes[VERSAO_ULTIMO_LOGIN] + 1
+    assert client.get('/api/reunioes', headers={'If-None-Match': etag_reunioes}).status_code == 304
+    assert client.get('/api/users', headers={'If-None-Match': etag_usuarios}).status_code == 200